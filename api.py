@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""API HTTP/JSON locale di chrono per dashboard e widget (`chrono api`).
+
+Le query SQLite girano sul pool di lettura di async_db.AsyncDB, ogni thread con
+la propria connessione. Ogni risposta porta un ETag ricavato da
+db_connector.generation(), che cambia solo quando qualcuno fa commit sul
+database, e dagli argomenti con cui la richiesta chiama il model (date di
+default comprese: "oggi" cambia a mezzanotte anche se il database no). Finché
+non cambiano, le risposte escono già serializzate dalla cache, oppure come 304
+se il client manda If-None-Match: i widget in polling non rieseguono le query
+di aggregazione.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import secrets
+import zlib
+from collections import OrderedDict
+from datetime import date
+from functools import partial
+
+from aiohttp import web
+
+from controller import async_db
+from controller import db_connector as db
+from controller import utility as util
+from model import clients, jobs, projects, reports
+
+DB_THREADS = 4
+CACHE_SIZE = 256
+MAX_LIMIT = 1000
+# l'ETag include un id di avvio: data_version riparte da capo a ogni processo
+BOOT = secrets.token_hex(4)
+
+
+class ResponseCache:
+    """Corpi JSON per (generazione, query risolta). Le richieste concorrenti per
+    la stessa chiave aspettano un'unica query invece di lanciarne una a testa."""
+
+    def __init__(self, maxsize: int = CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[tuple, asyncio.Future] = OrderedDict()
+
+    async def get(self, key: tuple, compute) -> bytes:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            entry = self._data[key] = asyncio.ensure_future(compute())
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        else:
+            self.hits += 1
+            self._data.move_to_end(key)
+        try:
+            return await asyncio.shield(entry)
+        except Exception:
+            # gli errori non si tengono in cache
+            if self._data.get(key) is entry:
+                del self._data[key]
+            raise
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def _int(request: web.Request, name: str, default: int | None = None):
+    value = request.query.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise web.HTTPBadRequest(text=f"{name} deve essere un intero")
+
+
+def _day(request: web.Request, name: str, default: str | None = None):
+    value = request.query.get(name, default)
+    if value is not None and not util.is_data_valid(value):
+        raise web.HTTPBadRequest(text=f"{name} deve essere nel formato YYYY-MM-DD")
+    return value
+
+
+def _page(request: web.Request) -> dict:
+    limit = _int(request, "limit", 50)
+    if not 0 < limit <= MAX_LIMIT:
+        raise web.HTTPBadRequest(text=f"limit deve essere tra 1 e {MAX_LIMIT}")
+    return {"limit": limit, "after": _int(request, "after")}
+
+
+def _list_clients(request):
+    return partial(clients.list_clients, **_page(request))
+
+
+def _list_projects(request):
+    active = request.query.get("active") in ("1", "true")
+    fetch = projects.list_active_project if active else projects.list_project
+    return partial(fetch, **_page(request))
+
+
+def _list_jobs(request):
+    return partial(jobs.list_jobs, **_page(request))
+
+
+def _search_jobs(request):
+    text = request.query.get("q", "").strip()
+    if not text:
+        raise web.HTTPBadRequest(text="manca il parametro q")
+    return partial(
+        jobs.search_jobs,
+        text,
+        request.query.get("client"),
+        request.query.get("project"),
+        _day(request, "from"),
+        _day(request, "to"),
+        _page(request)["limit"],
+    )
+
+
+def _report_totals(*args):
+    rows, total = reports.report(*args)
+    return {"rows": rows, "total_hours": total}
+
+
+def _report(request):
+    today = date.today().isoformat()
+    group = request.query.get("group", "day")
+    if group not in reports.GROUPS:
+        raise web.HTTPBadRequest(text=f"group deve essere uno di {reports.GROUPS}")
+    return partial(
+        _report_totals,
+        _day(request, "from", today),
+        _day(request, "to", today),
+        group,
+        request.query.get("client"),
+        request.query.get("project"),
+    )
+
+
+# percorso -> funzione che dalla richiesta ricava la query da eseguire, come
+# partial con tutti gli argomenti già risolti
+ROUTES = {
+    "/api/clients": _list_clients,
+    "/api/projects": _list_projects,
+    "/api/jobs": _list_jobs,
+    "/api/jobs/search": _search_jobs,
+    "/api/reports": _report,
+}
+
+
+def _query_key(query: partial) -> tuple:
+    """Chiave della query: funzione del model e argomenti risolti, non l'URL."""
+    fn = query.func
+    return (
+        f"{fn.__module__}.{fn.__qualname__}",
+        query.args,
+        tuple(sorted(query.keywords.items())),
+    )
+
+
+def _not_modified(request: web.Request, etag: str) -> bool:
+    header = request.headers.get("If-None-Match", "")
+    return etag in (tag.strip() for tag in header.split(",")) or header == "*"
+
+
+async def handle(request: web.Request) -> web.Response:
+    app = request.app
+    query = ROUTES[request.path](request)
+    key = _query_key(query)
+    gen = await app["db"].run(db.generation)
+    etag = f'"{BOOT}-{gen}-{zlib.crc32(repr(key).encode()):08x}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _not_modified(request, etag):
+        return web.Response(status=304, headers=headers)
+
+    async def compute() -> bytes:
+        result = await app["db"].run(query)
+        return json.dumps(result, ensure_ascii=False, default=db.jsonable).encode()
+
+    body = await app["cache"].get((gen, key), compute)
+    return web.Response(body=body, content_type="application/json", headers=headers)
+
+
+async def stats(request: web.Request) -> web.Response:
+    cache, adb = request.app["cache"], request.app["db"]
+    return web.json_response(
+        {
+            "cache": {"size": len(cache), "hits": cache.hits, "misses": cache.misses},
+            "db": {"writes": adb.writes, "commits": adb.commits},
+        }
+    )
+
+
+async def _close(app: web.Application) -> None:
+    await app["db"].close()
+
+
+def create_app(threads: int = DB_THREADS) -> web.Application:
+    app = web.Application()
+    app["db"] = async_db.AsyncDB(readers=threads)
+    app["cache"] = ResponseCache()
+    app.router.add_routes([web.get(path, handle) for path in ROUTES])
+    app.router.add_get("/api/stats", stats)
+    app.on_cleanup.append(_close)
+    return app
+
+
+def run(host: str = "127.0.0.1", port: int = 8765) -> None:
+    web.run_app(create_app(), host=host, port=port)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Generatore di dati sintetici per chrono, riproducibile dato il seed.
+
+Crea clienti, progetti e job senza sovrapposizioni distribuiti sui giorni
+feriali di `years` anni, con tipi di lavoro presi da utility.jobs_tag. Se in
+`years` anni i job non ci stanno con almeno MIN_SLOT minuti ciascuno, il
+periodo si allunga.
+
+    python bench/generate.py /tmp/chrono.sqlite --projects 400 --jobs 1000000
+"""
+import argparse
+import random
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from controller import archive  # noqa: E402
+from controller import db_connector as db  # noqa: E402
+from controller import utility as util  # noqa: E402
+from model import jobs  # noqa: E402
+
+# data fissa: stesso seed, stessi dati anche tra un anno e l'altro
+START = date(2020, 1, 1)
+# finestra lavorativa di ogni giorno
+DAY_START = 7 * 60
+DAY_MINUTES = 12 * 60
+# minuti minimi a disposizione di ogni job
+MIN_SLOT = 5
+
+
+def work_types(rng: random.Random):
+    """Codici jobs_tag pesati: soprattutto lavoro, poi viaggi, attese e fuori range."""
+    work = [k for k in util.jobs_tag("work") if k != "T"]
+    wait = list(util.jobs_tag("wait"))
+    out = list(util.jobs_tag("out"))
+    while True:
+        r = rng.random()
+        if r < 0.70:
+            yield rng.choice(work)
+        elif r < 0.85:
+            yield "T"
+        elif r < 0.95:
+            yield rng.choice(wait)
+        else:
+            yield rng.choice(out)
+
+
+def workdays(start: date):
+    day = start
+    while True:
+        if day.weekday() < 5:
+            yield day
+        day += timedelta(days=1)
+
+
+def job_rows(n_jobs: int, projects: list[str], years: int, seed: int):
+    """Genera n_jobs righe per add_jobs, in ordine cronologico."""
+    rng = random.Random(seed)
+    types = work_types(rng)
+    per_day = max(1, -(-n_jobs // (years * 261)))  # ~261 giorni feriali l'anno
+    # slot interi: un job finisce al più quando inizia il successivo
+    per_day = min(per_day, DAY_MINUTES // MIN_SLOT)
+    slot = DAY_MINUTES // per_day
+    produced = 0
+    for day in workdays(START):
+        # un progetto per giornata, come in una trasferta
+        project = rng.choice(projects)
+        base = datetime.combine(day, datetime.min.time())
+        for i in range(min(per_day, n_jobs - produced)):
+            begin = DAY_START + i * slot
+            length = max(1, int(slot * rng.uniform(0.5, 1.0)))
+            yield {
+                "project": project,
+                "start_at": (base + timedelta(minutes=begin)).isoformat(),
+                "end_at": (base + timedelta(minutes=begin + length)).isoformat(),
+                "work_type": next(types),
+                "description": f"intervento {rng.randrange(10_000)}",
+            }
+            produced += 1
+        if produced >= n_jobs:
+            return
+
+
+def generate(
+    db_path,
+    clients: int = 20,
+    projects: int = 100,
+    jobs_count: int = 10_000,
+    years: int = 5,
+    seed: int = 42,
+    batch_size: int = 5000,
+):
+    """Popola un database nuovo in db_path; ritorna il numero di job inseriti.
+
+    Gli archivi annuali di questo database vanno in db_path con estensione
+    .archive (una cartella), non in quella dell'installazione.
+
+    Solleva RuntimeError se add_jobs scarta delle righe: i dati generati non
+    devono averne.
+    """
+    rng = random.Random(seed)
+    db.close_all()
+    db.DB_PATH = Path(db_path)
+    archive.ARCHIVE_DIR = db.DB_PATH.with_suffix(".archive")
+    db.init_db()
+
+    with db.transaction() as cx:
+        cx.executemany(
+            "INSERT INTO clients(name, city, nation) VALUES (?,?,?)",
+            (
+                (f"Cliente {i}", f"Città {i}", rng.choice(["Italia", "UK", "Romania"]))
+                for i in range(clients)
+            ),
+        )
+        cx.executemany(
+            "INSERT INTO projects(client_id, name, active) VALUES (?,?,?)",
+            (
+                (rng.randint(1, clients), f"PRJ{i:05d}", int(rng.random() < 0.3))
+                for i in range(projects)
+            ),
+        )
+    names = [f"PRJ{i:05d}" for i in range(projects)]
+    inserted, errors = jobs.add_jobs(
+        job_rows(jobs_count, names, years, seed), batch_size=batch_size
+    )
+    if errors:
+        first = "; ".join(f"riga {n}: {msg}" for n, msg in errors[:5])
+        raise RuntimeError(f"{len(errors)} job generati scartati ({first})")
+    return inserted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("db_path", type=Path)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--projects", type=int, default=100)
+    parser.add_argument("--jobs", type=int, default=10_000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if args.db_path.exists():
+        parser.error(f"{args.db_path} esiste già")
+    n = generate(
+        args.db_path, args.clients, args.projects, args.jobs, args.years, args.seed
+    )
+    print(f"{n} job generati in {args.db_path}")
+
+
+if __name__ == "__main__":
+    main()
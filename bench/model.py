@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Benchmark del model layer su database sintetici di dimensioni crescenti.
+
+Per ogni dimensione genera un database con bench/generate.py e misura
+connessione, exist, add_job, inserimento in blocco, report, liste e
+dimensione del file. Il risultato è un JSON confrontabile tra commit:
+
+    python bench/model.py --sizes 10000,100000 --output bench.json
+    python bench/model.py --sizes 10000,100000 --compare bench.json
+"""
+import argparse
+import json
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from bench.generate import generate  # noqa: E402
+from controller import db_connector as db  # noqa: E402
+from model import clients, jobs, projects, reports  # noqa: E402
+
+
+def measure(fn, repeat: int = 5) -> float:
+    """Mediana in millisecondi di `repeat` esecuzioni di fn."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(times), 3)
+
+
+def cold_connect():
+    db.close_all()
+    db.connect()
+    db.connect(readonly=True)
+
+
+def single_inserts(n: int = 100):
+    # dopo l'ultimo job generato, così non ci sono sovrapposizioni
+    last = db.get_one("SELECT max(end_at) AS t FROM jobs")["t"]
+    start = datetime.fromisoformat(last) + timedelta(days=1)
+    project = db.get_one("SELECT name FROM projects LIMIT 1")["name"]
+    for i in range(n):
+        begin = start + timedelta(hours=i)
+        jobs.add_job(
+            begin.date().isoformat(),
+            project,
+            begin.isoformat(),
+            (begin + timedelta(minutes=30)).isoformat(),
+        )
+
+
+def run_size(size: int, args) -> dict:
+    metrics = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.sqlite"
+        start = time.perf_counter()
+        inserted = generate(
+            path, args.clients, args.projects, size, args.years, args.seed
+        )
+        metrics["bulk_insert_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        metrics["bulk_insert_rows"] = inserted
+        metrics["bulk_insert_rows_per_s"] = round(
+            inserted / (metrics["bulk_insert_ms"] / 1000)
+        )
+        db.connect().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        metrics["db_bytes"] = path.stat().st_size
+        metrics["db_bytes_per_job"] = round(metrics["db_bytes"] / inserted, 1)
+
+        span = db.get_one("SELECT min(day) AS a, max(day) AS b FROM daily_totals")
+        year = span["b"][:4]
+        metrics["connect_ms"] = measure(cold_connect)
+        metrics["exist_x1000_ms"] = measure(
+            lambda: [db.exist("projects", "name", "PRJ00001") for _ in range(1000)]
+        )
+        metrics["add_job_x100_ms"] = measure(single_inserts, repeat=1)
+        metrics["job_report_day_ms"] = measure(lambda: jobs.job_report(span["b"]))
+        for group in ("day", "month", "project", "client"):
+            metrics[f"report_year_{group}_ms"] = measure(
+                lambda: reports.report(f"{year}-01-01", f"{year}-12-31", group)
+            )
+        metrics["report_all_month_ms"] = measure(
+            lambda: reports.report(span["a"], span["b"], "month")
+        )
+        metrics["report_all_month_raw_ms"] = measure(
+            lambda: reports.report(span["a"], span["b"], "month", source="jobs"),
+            repeat=1,
+        )
+        metrics["list_clients_ms"] = measure(lambda: clients.list_clients(limit=50))
+        metrics["list_project_ms"] = measure(lambda: projects.list_project(limit=50))
+        metrics["list_jobs_page_ms"] = measure(lambda: jobs.list_jobs(limit=200))
+        metrics["overlap_sweep_ms"] = measure(
+            lambda: sum(1 for _ in jobs.all_overlaps()), repeat=1
+        )
+        db.close_all()
+    return metrics
+
+
+def git_commit() -> str | None:
+    proc = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    return proc.stdout.strip() or None
+
+
+def compare(old: dict, new: dict):
+    """Stampa la variazione percentuale di ogni metrica rispetto a un run precedente."""
+    before = {r["size"]: r["metrics"] for r in old["results"]}
+    for result in new["results"]:
+        prev = before.get(result["size"])
+        if prev is None:
+            continue
+        print(f"\n# {result['size']} job ({old.get('commit')} → {new.get('commit')})")
+        for name, value in result["metrics"].items():
+            if name in prev and prev[name]:
+                delta = (value - prev[name]) / prev[name] * 100
+                print(f"{name:28} {prev[name]:>14} → {value:>14}  {delta:+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--projects", type=int, default=100)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, help="scrive il JSON anche su file")
+    parser.add_argument("--compare", type=Path, help="JSON di un run precedente")
+    args = parser.parse_args()
+
+    result = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "seed": args.seed,
+        "results": [
+            {"size": size, "metrics": run_size(size, args)}
+            for size in (int(s) for s in args.sizes.split(","))
+        ],
+    }
+    print(json.dumps(result, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2))
+    if args.compare:
+        compare(json.loads(args.compare.read_text()), result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Benchmark dell'avvio della CLI.
+
+Misura con `python -X importtime` quanto costa importare chrono.py e con un
+cronometro quanto impiega `chrono.py --help`; fallisce (exit 1) se uno dei due
+supera il suo budget o se carica moduli che devono restare lazy.
+
+    python bench/startup.py --runs 20 --budget-ms 120 --help-budget-ms 250
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# moduli che l'import di chrono non deve caricare
+LAZY = (
+    "controller.db_connector",
+    "model",
+    "sqlite3",
+    "rich.console",
+    "rich.table",
+    "tabulate",
+    "textual",
+    "numpy",
+    "aiohttp",
+)
+# moduli che `chrono --help` non deve caricare: l'help formattato con rich è
+# opt-in (CHRONO_RICH_HELP=1)
+LAZY_HELP = LAZY + ("rich", "typer.rich_utils")
+
+
+def import_profile(*argv: str) -> tuple[float, set[str]]:
+    """Tempo cumulativo (ms) dell'import di chrono e moduli caricati.
+
+    Con argv esegue `chrono.py argv` invece del solo import.
+    """
+    command = ["chrono.py", *argv] if argv else ["-c", "import chrono"]
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *command],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total, modules = 0.0, set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[12:].split("|"))
+        if not cumulative.isdigit():
+            continue  # intestazione
+        modules.add(name)
+        if name in ("chrono", "__main__"):
+            total = int(cumulative) / 1000
+    return total, modules
+
+
+def help_time() -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "chrono.py", "--help"],
+        cwd=ROOT,
+        capture_output=True,
+        check=True,
+    )
+    return (time.perf_counter() - start) * 1000
+
+
+def leaked(loaded: set[str], lazy: tuple[str, ...]) -> list[str]:
+    return sorted(
+        m for m in loaded if any(m == name or m.startswith(name + ".") for name in lazy)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=120.0)
+    parser.add_argument("--help-budget-ms", type=float, default=250.0)
+    parser.add_argument("--json", action="store_true", help="stampa solo il JSON")
+    args = parser.parse_args()
+
+    imports, loaded = [], set()
+    for _ in range(args.runs):
+        ms, modules = import_profile()
+        imports.append(ms)
+        loaded |= modules
+    helps = [help_time() for _ in range(args.runs)]
+    _, help_loaded = import_profile("--help")
+
+    result = {
+        "runs": args.runs,
+        "import_ms_median": round(statistics.median(imports), 2),
+        "help_ms_median": round(statistics.median(helps), 2),
+        "budget_ms": args.budget_ms,
+        "help_budget_ms": args.help_budget_ms,
+        "eager_modules": leaked(loaded, LAZY),
+        "help_eager_modules": leaked(help_loaded, LAZY_HELP),
+    }
+    print(json.dumps(result, indent=None if args.json else 2))
+
+    ok = (
+        result["import_ms_median"] <= args.budget_ms
+        and result["help_ms_median"] <= args.help_budget_ms
+        and not result["eager_modules"]
+        and not result["help_eager_modules"]
+    )
+    if not args.json:
+        msg = "✅ Avvio nel budget" if ok else "❌ Regressione all'avvio"
+        print(msg, file=sys.stderr)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,35 @@
-import controller.db_connector as ts
-import controller.utility as util
-import model.projects as project
-import model.clients as client
-import typer
-from datetime import datetime
+# I model, il DB e i renderer (rich/tabulate) vengono importati dentro ai singoli
+# comandi: `chrono --help` e il completamento della shell non li caricano.
+import os
+import sys
 
-oggi = datetime.now().date().isoformat()
-app = typer.Typer()
+if __name__ == "__main__":
+    # con `chrono serve` attivo i comandi di sola lettura li esegue il demone
+    from controller import daemon
+
+    daemon.forward(sys.argv[1:])
+
+import controller.errors as er  # noqa: E402
+import controller.utility as util  # noqa: E402
+import typer  # noqa: E402
+from datetime import datetime, timedelta  # noqa: E402
+from pathlib import Path  # noqa: E402
+
+
+def oggi():
+    # calcolata a ogni invocazione: il demone resta acceso anche dopo mezzanotte
+    return datetime.now().date().isoformat()
+
+
+def dodici_settimane_fa():
+    return (datetime.now().date() - timedelta(weeks=12)).isoformat()
+
+
+PAGINA = 50
+# l'help formattato con rich costa ~250 ms di import: si attiva con CHRONO_RICH_HELP=1
+app = typer.Typer(
+    rich_markup_mode="rich" if os.environ.get("CHRONO_RICH_HELP") else None
+)
 
 
 # --------------------------------------------------------------------------------------------------------------
@@ -31,6 +54,29 @@ def ask_stop_process():
         return
 
 
+def sfoglia(fetch, title, limit=PAGINA, after=None):
+    """Mostra le righe a pagine di `limit`, con paginazione keyset sull'id."""
+    while True:
+        rows = fetch(limit=limit, after=after)
+        util.dict_to_table(rows, title=title)
+        if len(rows) < limit:
+            return
+        after = rows[-1]["id"]
+        if not sys.stdin.isatty() or not typer.confirm("Pagina successiva?", True):
+            typer.echo(f"Continua con --after {after}")
+            return
+
+
+def scegli(prompt, get):
+    """Chiede l'id di una riga e la recupera; se non esiste richiede."""
+    while True:
+        value = validazione_input(prompt, str.isdigit)
+        try:
+            return get(int(value))
+        except er.AppError as e:
+            print(f"⚠️  {e}\n")
+
+
 # --------------------------------------------------------------------------------------------------------------
 
 ## AGGIUNTA DATI
@@ -41,10 +87,13 @@ def ask_stop_process():
 
 
 @app.command()
-def lista_clienti():
-    rows = client.list_clients()
-    util.dict_to_table(rows, title="Lista Clienti")
-    return rows
+def lista_clienti(
+    limit: int = typer.Option(PAGINA, "--limit", "-l", min=1),
+    after: int = typer.Option(None, "--after", help="Id dell'ultimo cliente visto"),
+):
+    import model.clients as client
+
+    sfoglia(client.list_clients, "Lista Clienti", limit, after)
 
 
 @app.command()
@@ -53,6 +102,9 @@ def aggiungi_cliente(
     citta: str = typer.Option(None, "--città", "-c", prompt="Città"),
     nazione: str = typer.Option(None, "--nazione", "-s", prompt="Nazione"),
 ) -> None:
+    import controller.db_connector as ts
+    import model.clients as client
+
     cl = client.Client(nome, citta, nazione)
     ask_stop_process()
     client.add_client(cl)
@@ -64,15 +116,11 @@ def aggiungi_cliente(
 
 @app.command()
 def aggiorna_cliente():
+    import model.clients as client
+
     new = client.Client()
-    old = client.Client()
-    rows = lista_clienti()
-    index = validazione_input(
-        "Quale cliente cambi? ",
-        lambda v: v.isdigit() and 1 <= int(v) <= len(rows),
-    )
-    old.name = rows[int(index) - 1]["name"]
-    old.city = rows[int(index) - 1]["city"]
+    sfoglia(client.list_clients, "Lista Clienti")
+    old = scegli("Quale cliente cambi (id)? ", client.get_client)
     typer.echo("inserisci i nuovi parametri.")
     new.name = typer.prompt("    nuovo nome? ")
     new.city = typer.prompt("    nuova città? ")
@@ -84,14 +132,11 @@ def aggiorna_cliente():
 
 @app.command()
 def cancella_cliente():
-    rows = lista_clienti()
-    cl = client.Client()
-    index = validazione_input(
-        "Quale cliente cancelli? ",
-        lambda v: v.isdigit() and 1 <= int(v) <= len(rows),
-    )
-    cl.name = rows[int(index) - 1]["name"]
-    cl.city = rows[int(index) - 1]["city"]
+    import controller.db_connector as ts
+    import model.clients as client
+
+    sfoglia(client.list_clients, "Lista Clienti")
+    cl = scegli("Quale cliente cancelli (id)? ", client.get_client)
     ask_stop_process()
     client.delete_client(cl)
     if ts.exist("clients", "city", cl.city):
@@ -104,41 +149,44 @@ def cancella_cliente():
 
 
 @app.command()
-def lista_progetti():
-    rows = project.list_project()
-    util.dict_to_table(rows, title="Lista Progetti")
-    return rows
+def lista_progetti(
+    limit: int = typer.Option(PAGINA, "--limit", "-l", min=1),
+    after: int = typer.Option(None, "--after", help="Id dell'ultimo progetto visto"),
+):
+    import model.projects as project
+
+    sfoglia(project.list_project, "Lista Progetti", limit, after)
 
 
 @app.command()
-def lista_progetti_attivi():
-    rows = project.list_active_project()
-    util.dict_to_table(rows, title="Lista Progetti Attivi")
-    return rows
+def lista_progetti_attivi(
+    limit: int = typer.Option(PAGINA, "--limit", "-l", min=1),
+    after: int = typer.Option(None, "--after", help="Id dell'ultimo progetto visto"),
+):
+    import model.projects as project
+
+    sfoglia(project.list_active_project, "Lista Progetti Attivi", limit, after)
 
 
 @app.command()
 def aggiorna_stato_progetto():
-    rows = lista_progetti()
-    p = project.Project()
-    index = typer.prompt("Quale progetto vuoi cambiare? ")
-    p.name = rows[int(index) - 1]["project"]
-    p.active = not rows[int(index) - 1]["active"]
+    import model.projects as project
+
+    sfoglia(project.list_project, "Lista Progetti")
+    p = scegli("Quale progetto vuoi cambiare (id)? ", project.get_project)
+    p.active = int(not p.active)
     ask_stop_process()
     project.update_project_state(p)
 
 
 @app.command()
 def aggiungi_progetto():
-    rows = lista_clienti()
+    import model.clients as client
+    import model.projects as project
+
+    sfoglia(client.list_clients, "Lista Clienti")
     pr = project.Project()
-    cl = client.Client()
-    index = validazione_input(
-        "Quale cliente scegli? ",
-        lambda v: v.isdigit() and 1 <= int(v) <= len(rows),
-    )
-    cl.name = rows[int(index) - 1]["name"]
-    cl.city = rows[int(index) - 1]["city"]
+    cl = scegli("Quale cliente scegli (id)? ", client.get_client)
     pr.name = typer.prompt("Quale nome vuoi usare?")
     ask_stop_process()
     project.add_project(pr, cl)
@@ -146,14 +194,11 @@ def aggiungi_progetto():
 
 @app.command()
 def cambia_nome_progetto() -> None:
-    rows = lista_progetti()
-    vp = project.Project()
+    import model.projects as project
+
+    sfoglia(project.list_project, "Lista Progetti")
     np = project.Project()
-    index = validazione_input(
-        "Quale cliente scegli? ",
-        lambda v: v.isdigit() and 1 <= int(v) <= len(rows),
-    )
-    vp.name = rows[int(index) - 1]["project"]
+    vp = scegli("Quale progetto scegli (id)? ", project.get_project)
     np.name = validazione_input(
         "Che nome diamo al progetto? ",
         lambda v: len(v) > 0,
@@ -165,19 +210,18 @@ def cambia_nome_progetto() -> None:
 
 @app.command()
 def cancella_progetto():
-    rows = lista_progetti()
-    p = project.Project()
-    index = validazione_input(
-        "quale progetto vuoi cancellare?",
-        lambda v: v.isdigit() and 1 <= int(v) <= len(rows),
-    )
-    p.name = rows[int(index) - 1]["project"]
+    import model.projects as project
+
+    sfoglia(project.list_project, "Lista Progetti")
+    p = scegli("quale progetto vuoi cancellare (id)? ", project.get_project)
     ask_stop_process()
     project.delete_project(p)
 
 
 @app.command()
 def controlla_stato_progetti():
+    import model.projects as project
+
     stato = project.check_project_state()
     print(*(f"{i}. {d['name']}" for i, d in enumerate(stato, start=1)), sep="\n")
 
@@ -187,7 +231,9 @@ def controlla_stato_progetti():
 
 @app.command()
 def aggiungi_job():
-    lista_progetti_attivi()
+    import model.projects as project
+
+    sfoglia(project.list_active_project, "Lista Progetti Attivi")
 
     data = validazione_input(
         "Inserisci la data (YYYY-MM-DD): ",
@@ -212,9 +258,220 @@ def cancella_job():
     return
 
 
+@app.command()
+def importa_job(
+    file: Path = typer.Argument(..., exists=True, dir_okay=False),
+    formato: str = typer.Option(None, "--formato", "-f", help="csv | ndjson"),
+    batch: int = typer.Option(5000, "--batch", "-b", min=1),
+    sovrapposizioni: bool = typer.Option(
+        False, "--ammetti-sovrapposizioni", help="Non scartare i job sovrapposti"
+    ),
+    veloce: bool = typer.Option(
+        False,
+        "--veloce",
+        help="Un'unica transazione, tabelle derivate aggiornate in blocco",
+    ),
+):
+    import model.jobs as job
+
+    formato = formato or ("ndjson" if file.suffix in (".ndjson", ".jsonl") else "csv")
+    match formato:
+        case "csv":
+            rows = util.iter_csv(file)
+        case "ndjson":
+            rows = util.iter_ndjson(file)
+        case _:
+            raise typer.BadParameter(f"Formato non riconosciuto: {formato}")
+
+    inseriti, errori = job.add_jobs(
+        rows,
+        batch_size=batch,
+        allow_overlap=sovrapposizioni,
+        numbered=True,
+        deferred=veloce,
+    )
+    for n, msg in errori:
+        typer.echo(f"⚠️  riga {n}: {msg}")
+    typer.echo(f"✅ Importati {inseriti} job, {len(errori)} righe scartate")
+
+
+@app.command()
+def controlla_sovrapposizioni():
+    import model.jobs as job
+
+    n = 0
+    for a, b in job.all_overlaps():
+        n += 1
+        typer.echo(
+            f"⚠️  job {a['id']} ({a['project']} {a['start_at']} → {a['end_at']}) "
+            f"e job {b['id']} ({b['project']} {b['start_at']} → {b['end_at']})"
+        )
+    typer.echo(f"{n} sovrapposizioni trovate" if n else "✅ Nessuna sovrapposizione")
+
+
 ##RECUPERO DATI
 
 
+@app.command()
+def report(
+    da: str = typer.Option(default_factory=oggi, help="Primo giorno (YYYY-MM-DD)"),
+    a: str = typer.Option(default_factory=oggi, help="Ultimo giorno (YYYY-MM-DD)"),
+    raggruppa: str = typer.Option(
+        "day",
+        "--raggruppa",
+        "-g",
+        help="day | week | month | year | project | client | category",
+    ),
+    cliente: str = typer.Option(None, "--cliente", "-c"),
+    progetto: str = typer.Option(None, "--progetto", "-p"),
+):
+    import model.reports as reports
+
+    if not (util.is_data_valid(da) and util.is_data_valid(a)):
+        raise typer.BadParameter("Le date devono essere nel formato YYYY-MM-DD")
+    try:
+        rows, totale = reports.report(da, a, raggruppa, cliente, progetto)
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+    util.dict_to_table(rows, title=f"Report {da} → {a}")
+    typer.echo(f"Totale ore: {totale}")
+
+
+@app.command()
+def cerca_job(
+    testo: str = typer.Argument(..., help="Parole da cercare"),
+    cliente: str = typer.Option(None, "--cliente", "-c"),
+    progetto: str = typer.Option(None, "--progetto", "-p"),
+    da: str = typer.Option(None, "--da", help="Primo giorno (YYYY-MM-DD)"),
+    a: str = typer.Option(None, "--a", help="Ultimo giorno (YYYY-MM-DD)"),
+    limit: int = typer.Option(PAGINA, "--limit", help="Risultati da mostrare"),
+):
+    """Cerca nei job per descrizione, luogo e tipo di lavoro."""
+    import model.jobs as jobs
+
+    for giorno in (da, a):
+        if giorno and not util.is_data_valid(giorno):
+            raise typer.BadParameter("Le date devono essere nel formato YYYY-MM-DD")
+    rows = jobs.search_jobs(testo, cliente, progetto, da, a, limit)
+    if not rows:
+        typer.echo("Nessun job trovato.")
+        return
+    util.dict_to_table(rows, title=f"Job che contengono '{testo}'")
+
+
+@app.command()
+def esporta_report(
+    formato: str = typer.Option("csv", "--formato", "-f", help="csv | json | ndjson"),
+    output: Path = typer.Option(
+        None, "--output", "-o", help="File di destinazione (default stdout)"
+    ),
+    da: str = typer.Option(None, "--da", help="Primo giorno (YYYY-MM-DD)"),
+    a: str = typer.Option(None, "--a", help="Ultimo giorno (YYYY-MM-DD)"),
+    raggruppa: str = typer.Option(
+        None,
+        "--raggruppa",
+        "-g",
+        help="Esporta i totali: day | week | month | year | project | client | category",
+    ),
+    cliente: str = typer.Option(None, "--cliente", "-c"),
+    progetto: str = typer.Option(None, "--progetto", "-p"),
+):
+    import controller.db_connector as ts
+    import model.reports as reports
+
+    writers = util.WRITERS
+    if formato not in writers:
+        raise typer.BadParameter(f"Formato non riconosciuto: {formato}")
+    if not all(util.is_data_valid(d) for d in (da, a) if d):
+        raise typer.BadParameter("Le date devono essere nel formato YYYY-MM-DD")
+    try:
+        if raggruppa:
+            sql, params = reports.report_query(da, a, raggruppa, cliente, progetto)
+        else:
+            sql, params = reports.jobs_query(da, a, cliente, progetto)
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+
+    rows = ts.iter_all(sql, params)
+    if output is None:
+        writers[formato](rows, sys.stdout)
+    else:
+        with open(output, "w", newline="", encoding="utf-8") as out:
+            writers[formato](rows, out)
+
+
+@app.command()
+def report_batch(
+    output: Path = typer.Option(..., "--output", "-o", help="Cartella dei report"),
+    anno: int = typer.Option(None, "--anno", help="Tutto l'anno indicato"),
+    da: str = typer.Option(None, "--da", help="Primo giorno (YYYY-MM-DD)"),
+    a: str = typer.Option(None, "--a", help="Ultimo giorno (YYYY-MM-DD)"),
+    formato: str = typer.Option("csv", "--formato", "-f", help="csv | json | ndjson"),
+    processi: int = typer.Option(None, "--processi", "-j", min=1),
+):
+    """Un report per cliente e per mese, generato in parallelo."""
+    import model.batch as batch
+
+    if anno:
+        da, a = f"{anno}-01-01", f"{anno}-12-31"
+    if not (da and a and util.is_data_valid(da) and util.is_data_valid(a)):
+        raise typer.BadParameter("Indica --anno oppure --da e --a (YYYY-MM-DD)")
+    if formato not in util.WRITERS:
+        raise typer.BadParameter(f"Formato non riconosciuto: {formato}")
+
+    with typer.progressbar(length=1, label="Report") as bar:
+
+        def progress(done, total):
+            bar.length = total
+            bar.update(done - bar.pos)
+
+        rows = batch.batch_reports(da, a, output, formato, processi, progress)
+    ore = round(sum(r["hours"] for r in rows), 2)
+    typer.echo(f"✅ {len(rows)} report in {output} ({ore} ore), riepilogo.csv")
+
+
+@app.command()
+def analisi(
+    da: str = typer.Option(
+        default_factory=dodici_settimane_fa, help="Primo giorno (YYYY-MM-DD)"
+    ),
+    a: str = typer.Option(default_factory=oggi, help="Ultimo giorno (YYYY-MM-DD)"),
+    obiettivo: float = typer.Option(
+        40.0, "--obiettivo", "-t", min=0.1, help="Ore fatturabili per settimana"
+    ),
+    media: int = typer.Option(
+        4, "--media", "-m", min=1, help="Settimane della media mobile per cliente"
+    ),
+    cliente: str = typer.Option(None, "--cliente", "-c"),
+    progetto: str = typer.Option(None, "--progetto", "-p"),
+):
+    """Ore fatturabili, quota di viaggio, utilizzo settimanale e medie per cliente."""
+    import model.analytics as analytics
+
+    if not (util.is_data_valid(da) and util.is_data_valid(a)):
+        raise typer.BadParameter("Le date devono essere nel formato YYYY-MM-DD")
+    totali = analytics.billing(da, a, cliente, progetto)
+    if not totali["hours"]:
+        typer.echo("Nessun job nel periodo.")
+        return
+    util.dict_to_table(
+        analytics.categories(da, a, cliente, progetto),
+        title=f"Categorie {da} → {a}",
+    )
+    typer.echo(
+        f"Fatturabili: {totali['billable']} h, non fatturabili: "
+        f"{totali['non_billable']} h, viaggio: {totali['travel_share']}%"
+    )
+    util.dict_to_table(
+        analytics.weekly(da, a, obiettivo, cliente, progetto),
+        title=f"Utilizzo settimanale (obiettivo {obiettivo} h)",
+    )
+    util.dict_to_table(
+        analytics.rolling(da, a, media, cliente, progetto),
+        title=f"Ore per cliente, media mobile su {media} settimane",
+    )
+
+
 # def report_giornaliero(giorno) -> None:
 #    righe, totali = ts.day_report(giorno)
 #    print(f"Totale ore: {totali}")
@@ -223,11 +480,206 @@ def cancella_job():
 # --------------------------------------------------------------------------------------------------------------
 
 
+@app.command()
+def tui():
+    from tui import ChronoApp
+
+    ChronoApp().run()
+
+
+@app.command()
+def serve(
+    socket: str = typer.Option(None, "--socket", help="Percorso del socket Unix"),
+):
+    """Demone che esegue i comandi di sola lettura senza costi di avvio."""
+    from controller import daemon
+
+    try:
+        daemon.serve(app, socket or daemon.SOCKET_PATH)
+    except RuntimeError as e:
+        typer.echo(f"❌ {e}")
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def api(
+    host: str = typer.Option("127.0.0.1", "--host"),
+    port: int = typer.Option(8765, "--port"),
+):
+    """API HTTP/JSON locale con risposte in cache e ETag."""
+    import api
+
+    api.run(host, port)
+
+
 @app.command()
 def init_database():
+    import controller.db_connector as ts
+
     ts.init_db()
     typer.echo(f"Database creato in:{ts.DB_PATH}")
 
 
+@app.command()
+def migra(
+    stato: bool = typer.Option(False, "--stato", help="Mostra le versioni e basta"),
+    versione: int = typer.Option(None, "--versione", help="Ferma a questa versione"),
+    blocco: int = typer.Option(5000, "--blocco", min=1, help="Job per transazione"),
+    pausa: float = typer.Option(
+        0.0, "--pausa", min=0.0, help="Secondi di pausa tra un blocco e l'altro"
+    ),
+):
+    """Porta lo schema del database all'ultima versione, a blocchi e riprendibile."""
+    from contextlib import ExitStack
+
+    from controller import migrations
+
+    if stato:
+        util.dict_to_table(
+            migrations.status(),
+            title=f"Schema alla versione {migrations.current_version()}",
+        )
+        return
+
+    with ExitStack() as stack:
+        bars = {}
+
+        def progress(m, done, total):
+            if m.version not in bars:
+                label = f"{m.version}. {m.description}"
+                bars[m.version] = stack.enter_context(
+                    typer.progressbar(length=total, label=label)
+                )
+            bar = bars[m.version]
+            bar.update(done - bar.pos)
+
+        applied = migrations.migrate(versione, blocco, pausa, progress)
+    if applied:
+        typer.echo(f"✅ Applicate le migrazioni {', '.join(map(str, applied))}")
+    else:
+        typer.echo(f"✅ Schema già alla versione {migrations.current_version()}")
+
+
+@app.command()
+def backup(
+    cartella: Path = typer.Option(None, help="Cartella degli archivi"),
+    tieni: int = typer.Option(None, help="Quanti archivi conservare"),
+    pagine: int = typer.Option(None, help="Pagine copiate per passo"),
+):
+    """Snapshot compresso e verificato del database, con rotazione."""
+    import controller.db_connector as ts
+
+    with typer.progressbar(length=1, label="Backup") as bar:
+
+        def progress(done, total):
+            bar.length = total
+            bar.update(done - bar.pos)
+
+        archive = ts.snapshot(
+            cartella or ts.BACKUP_DIR,
+            tieni or ts.BACKUP_KEEP,
+            pagine or ts.BACKUP_PAGES,
+            progress,
+        )
+    size = archive.stat().st_size / 1024
+    typer.echo(f"✅ Backup verificato: {archive} ({size:.0f} KiB)")
+
+
+@app.command()
+def archivia(
+    anni: list[int] = typer.Argument(None, help="Anni chiusi da archiviare"),
+    fino_a: int = typer.Option(
+        None, "--fino-a", help="Archivia tutti gli anni fino a questo compreso"
+    ),
+    compatta: bool = typer.Option(
+        False, "--compatta", help="Compatta il database principale (VACUUM) alla fine"
+    ),
+    elenco: bool = typer.Option(False, "--elenco", help="Mostra gli archivi"),
+):
+    """Sposta i job degli anni chiusi in un archivio in sola lettura per anno."""
+    from controller import archive
+
+    if elenco:
+        util.dict_to_table(archive.summary(), title="Archivi annuali")
+        return
+    anni = sorted(set(anni or []) | set(archive.live_years(fino_a) if fino_a else []))
+    if not anni:
+        raise typer.BadParameter("Indica gli anni da archiviare oppure --fino-a")
+    for anno in anni:
+        try:
+            spostati = archive.archive_year(anno, vacuum=compatta and anno == anni[-1])
+        except ValueError as e:
+            raise typer.BadParameter(str(e))
+        typer.echo(f"✅ {anno}: {spostati} job in {archive.path_for(anno)}")
+
+
+@app.command()
+def ricostruisci_rollup():
+    import controller.db_connector as ts
+
+    ts.rebuild_rollup()
+    typer.echo("✅ Totali giornalieri ricalcolati")
+
+
+@app.command()
+def verifica_indici():
+    from model import query_check
+
+    scans = query_check.find_scans()
+    for sql, detail in scans:
+        typer.echo(f"❌ {detail}\n    {sql}")
+    if scans:
+        raise typer.Exit(code=1)
+    typer.echo("✅ Tutte le query del model usano un indice")
+
+
+@app.command()
+def statistiche_db(
+    top: int = typer.Option(15, help="Numero di istruzioni da mostrare"),
+    reset: bool = typer.Option(False, help="Azzera le statistiche salvate"),
+):
+    """Query più costose registrate con CHRONO_DB_STATS=1."""
+    from controller import db_stats
+
+    if reset:
+        db_stats.STATS_PATH.unlink(missing_ok=True)
+        typer.echo("✅ Statistiche azzerate")
+        return
+    data = db_stats.load()
+    if not data["statements"]:
+        typer.echo("Nessuna statistica: esegui i comandi con CHRONO_DB_STATS=1")
+        return
+    statements = sorted(
+        data["statements"].items(), key=lambda item: item[1]["seconds"], reverse=True
+    )
+    util.dict_to_table(
+        [
+            {
+                "sql": sql if len(sql) <= 100 else sql[:97] + "...",
+                "chiamate": s["calls"],
+                "totale ms": round(s["seconds"] * 1000, 1),
+                "medio ms": round(s["seconds"] * 1000 / max(s["calls"], 1), 3),
+                "max ms": round(s["max_seconds"] * 1000, 1),
+                "righe": s["rows"],
+            }
+            for sql, s in statements[:top]
+        ],
+        title="Istruzioni per tempo totale",
+    )
+    util.dict_to_table(
+        [
+            {
+                "comando": command,
+                "esecuzioni": c["runs"],
+                "connessioni per esecuzione": round(c["connections"] / c["runs"], 1),
+            }
+            for command, c in data["commands"].items()
+        ],
+        title="Connessioni aperte per comando",
+    )
+    if data["slow"]:
+        typer.echo(f"Query lente registrate: {len(data['slow'])}")
+
+
 if __name__ == "__main__":
     app()
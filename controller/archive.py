@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""Archivi annuali dei job (`chrono archivia`).
+
+I job degli anni chiusi passano dal database principale a un file per anno in
+ARCHIVE_DIR, con i propri totali giornalieri; il database principale resta
+piccolo, e con lui indici, checkpoint del WAL e backup. Gli archivi non si
+modificano più: si scrivono una volta, in un file temporaneo rinominato a fine
+lavoro, e restano in sola lettura.
+
+Le query che coprono anni archiviati li vedono attraverso union(): l'archivio
+viene collegato con ATTACH alla connessione in lettura del thread e la tabella
+diventa un UNION ALL tra database principale e archivi. SQLite porta le
+condizioni sul periodo dentro ogni ramo, che usa i propri indici. Ogni archivio
+ha anche il proprio indice full-text jobs_fts, per la ricerca nei job.
+"""
+import os
+import shutil
+import sqlite3
+import threading
+from datetime import date
+from pathlib import Path
+
+from controller import db_connector as db
+
+ARCHIVE_DIR = Path("controller/archive")
+
+# colonne in comune tra database principale e archivi
+COLUMNS = {
+    "jobs": "id, workday_id, project_id, start_at, end_at, place, work_type_id, "
+    "description, created_at",
+    "daily_totals": "day, project_id, work_type_id, seconds, jobs",
+}
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS {0}.jobs (
+  id INTEGER PRIMARY KEY,      -- stesso id del database principale
+  workday_id INTEGER,
+  project_id INTEGER NOT NULL,
+  start_at TEXT NOT NULL,
+  end_at   TEXT NOT NULL,
+  place TEXT,
+  work_type_id INTEGER,
+  description TEXT,
+  created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS {0}.idx_jobs_range ON jobs(start_at, end_at, project_id);
+CREATE INDEX IF NOT EXISTS {0}.idx_jobs_project_range
+  ON jobs(project_id, start_at, end_at);
+
+CREATE TABLE IF NOT EXISTS {0}.daily_totals (
+  day TEXT NOT NULL,
+  project_id INTEGER NOT NULL,
+  work_type_id INTEGER NOT NULL DEFAULT 0,
+  seconds INTEGER NOT NULL DEFAULT 0,
+  jobs INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY(day, project_id, work_type_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS {0}.idx_daily_totals_project
+  ON daily_totals(project_id, day);
+
+-- come jobs_fts del database principale, ma con il testo nell'indice: gli
+-- archivi non hanno la vista jobs_search né work_types
+CREATE VIRTUAL TABLE IF NOT EXISTS {0}.jobs_fts USING fts5(
+  description, place, work_type,
+  tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+);
+"""
+
+# i totali dell'archivio si ricalcolano dai suoi job a ogni archiviazione
+ROLLUP_SQL = f"""
+INSERT INTO {{0}}.daily_totals(day, project_id, work_type_id, seconds, jobs)
+SELECT date(j.start_at), j.project_id, IFNULL(j.work_type_id, 0),
+       SUM({db.JOB_SECONDS.format("j")}), COUNT(*)
+FROM {{0}}.jobs j
+GROUP BY 1, 2, 3
+"""
+
+# anche l'indice full-text si ricalcola; il tipo di lavoro viene da main.work_types
+FTS_SQL = f"""
+INSERT INTO {{0}}.jobs_fts(rowid, description, place, work_type)
+SELECT a.id, a.description, a.place, {db.WORK_TYPE_TEXT.format("a")}
+FROM {{0}}.jobs a
+"""
+
+
+def path_for(year: int) -> Path:
+    return ARCHIVE_DIR / f"{year}.sqlite"
+
+
+def archived_years() -> list[int]:
+    if not ARCHIVE_DIR.is_dir():
+        return []
+    return sorted(
+        int(p.stem) for p in ARCHIVE_DIR.glob("*.sqlite") if p.stem.isdigit()
+    )
+
+
+def years_between(start_day: str | None, end_day: str | None) -> list[int]:
+    """Anni archiviati che cadono nel periodo (estremi opzionali e inclusi)."""
+    first = int(start_day[:4]) if start_day else 0
+    last = int(end_day[:4]) if end_day else 9999
+    return [y for y in archived_years() if first <= y <= last]
+
+
+# per id di connessione: inode degli archivi collegati e chiave delle copie
+# temporanee (vedi attach e _copy)
+_attached = threading.local()
+
+# indici delle copie temporanee, creati dopo averle riempite
+TEMP_INDEXES = {
+    "jobs": ("start_at", "project_id, start_at", "id"),
+    "daily_totals": ("day", "project_id, day"),
+}
+# condizioni su primo e ultimo giorno del periodo, per tabella
+PERIOD = {
+    "jobs": ("start_at >= ?", "start_at < date(?, '+1 day')"),
+    "daily_totals": ("day >= ?", "day <= ?"),
+}
+
+
+def _state(cx) -> dict:
+    state = getattr(_attached, "state", None)
+    if state is None:
+        state = _attached.state = {}
+    return state.setdefault(id(cx), {"inodes": {}, "copy": {}})
+
+
+def attach(cx, years) -> None:
+    """Collega a cx gli archivi degli anni indicati e scollega gli altri.
+
+    SQLite ammette pochi database collegati per connessione (10 di default):
+    restano collegati solo quelli della query corrente. Un archivio rifatto è
+    un file nuovo: se l'inode è cambiato lo si ricollega.
+    """
+    inodes = _state(cx)["inodes"]
+    wanted = {f"archive_{y}": y for y in years}
+    for name in [r[1] for r in cx.execute("PRAGMA database_list")]:
+        if name.startswith("archive_") and name not in wanted:
+            cx.execute(f"DETACH DATABASE {name}")
+            inodes.pop(name, None)
+    names = {r[1] for r in cx.execute("PRAGMA database_list")}
+    for name, year in wanted.items():
+        path = path_for(year)
+        inode = os.stat(path).st_ino
+        if name in names:
+            if inodes.get(name) == inode:
+                continue
+            cx.execute(f"DETACH DATABASE {name}")
+        cx.execute(f"ATTACH DATABASE ? AS {name}", (str(path),))
+        inodes[name] = inode
+
+
+def attached_groups(cx, years):
+    """Collega a cx gli archivi degli anni a gruppi, quanti SQLite ne ammette
+    per connessione, e genera gli anni di ogni gruppo; alla fine li scollega."""
+    group = cx.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    for i in range(0, len(years), group):
+        chunk = years[i : i + group]
+        attach(cx, chunk)
+        yield chunk
+    attach(cx, [])
+
+
+def _arm(table: str, schema: str, conditions=()) -> str:
+    """SELECT di table da uno schema di archivio, con le condizioni date.
+
+    Un job ancora presente nel database principale vale quello: una copia
+    rimasta nell'archivio non si conta due volte.
+    """
+    conditions = list(conditions)
+    if table == "jobs":
+        conditions.append("NOT EXISTS (SELECT 1 FROM main.jobs m WHERE m.id = a.id)")
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"SELECT {COLUMNS[table]} FROM {schema}.{table} a{where}"
+
+
+def _copy(cx, table: str, years, start_day, end_day) -> str:
+    """Copia in una tabella temporanea di cx le righe del periodo degli archivi.
+
+    Serve quando gli anni sono più dei database collegabili: gli archivi si
+    collegano a gruppi e si scollegano subito. Gli archivi non cambiano, quindi
+    la copia si riusa finché anni, file e periodo restano gli stessi.
+    """
+    name = f"temp.archive_{table}"
+    key = (tuple((y, os.stat(path_for(y)).st_ino) for y in years), start_day, end_day)
+    copies = _state(cx)["copy"]
+    exists = cx.execute(f"PRAGMA temp.table_info(archive_{table})").fetchone()
+    if exists and copies.get(table) == key:
+        return name
+    copies.pop(table, None)
+    conditions, params = [], []
+    for condition, day in zip(PERIOD[table], (start_day, end_day)):
+        if day:
+            conditions.append(condition)
+            params.append(day)
+    cx.execute(f"DROP TABLE IF EXISTS {name}")
+    cx.execute(f"CREATE TABLE {name} AS SELECT {COLUMNS[table]} FROM {table} LIMIT 0")
+    for chunk in attached_groups(cx, years):
+        for y in chunk:
+            arm = _arm(table, f"archive_{y}", conditions)
+            cx.execute(f"INSERT INTO {name} {arm}", params)
+    for n, columns in enumerate(TEMP_INDEXES[table]):
+        cx.execute(
+            f"CREATE INDEX temp.idx_archive_{table}_{n} "
+            f"ON archive_{table}({columns})"
+        )
+    copies[table] = key
+    return name
+
+
+def union(table: str, start_day: str | None, end_day: str | None, cx=None) -> str:
+    """Espressione FROM per table su database principale e archivi del periodo.
+
+    Senza archivi nel periodo è il nome della tabella e basta. Gli archivi
+    vengono collegati a cx (default la connessione in lettura del thread), che
+    deve essere quella che poi esegue la query; se sono più di quanti SQLite ne
+    collega, le loro righe del periodo passano da una tabella temporanea.
+    """
+    years = years_between(start_day, end_day)
+    if not years:
+        return table
+    cx = cx or db.connect(readonly=True)
+    arms = [f"SELECT {COLUMNS[table]} FROM main.{table}"]
+    if len(years) <= cx.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED):
+        attach(cx, years)
+        arms += [_arm(table, f"archive_{y}") for y in years]
+    else:
+        copy = _copy(cx, table, years, start_day, end_day)
+        arms.append(f"SELECT {COLUMNS[table]} FROM {copy}")
+    return "(" + " UNION ALL ".join(arms) + ")"
+
+
+def archive_year(year: int, vacuum: bool = False) -> int:
+    """Sposta i job di year nel suo archivio e ritorna quanti ne ha spostati.
+
+    Se l'archivio esiste già (job aggiunti in ritardo a un anno chiuso) i nuovi
+    job si aggiungono a quelli archiviati. L'archivio viene scritto in un file
+    temporaneo che prende il suo nome definitivo solo dopo il commit:
+
+    1. i job dell'anno si copiano nel file temporaneo (commit sull'archivio);
+    2. dal database principale si tolgono solo i job copiati e rimasti uguali
+       alla copia, nella stessa transazione che prende il lock di scrittura:
+       un job aggiunto o modificato nel frattempo resta dov'è;
+    3. dall'archivio si tolgono le copie dei job rimasti nel principale e si
+       ricalcolano totali e indice full-text; poi il file viene rinominato.
+
+    Un'archiviazione interrotta lascia il file temporaneo, da cui la successiva
+    riparte: nessun job va perso né viene contato due volte.
+    """
+    if year >= date.today().year:
+        raise ValueError(f"Il {year} non è ancora chiuso")
+    first, last = f"{year}-01-01", f"{year + 1}-01-01"
+    final = path_for(year)
+    part = final.with_suffix(".part")
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    if not part.exists() and final.exists():
+        shutil.copyfile(final, part)  # la copia non eredita la sola lettura
+    if part.exists():
+        os.chmod(part, 0o644)  # interrotta dopo il passaggio in sola lettura
+
+    columns = COLUMNS["jobs"]
+    same = " AND ".join(f"j.{c} IS a.{c}" for c in columns.split(", "))
+    cx = db.connect()
+    cx.execute("ATTACH DATABASE ? AS archive", (str(part),))
+    try:
+        cx.execute("PRAGMA archive.journal_mode = DELETE")
+        cx.executescript(SCHEMA_SQL.format("archive"))
+        with db.transaction() as tx:
+            tx.execute(
+                f"""INSERT OR REPLACE INTO archive.jobs({columns})
+                    SELECT {columns} FROM main.jobs
+                    WHERE start_at >= ? AND start_at < ?""",
+                (first, last),
+            )
+        with db.transaction() as tx:
+            # i trigger tolgono i job anche da totali, indice a intervalli e full-text
+            moved = tx.execute(
+                f"""DELETE FROM main.jobs WHERE id IN (
+                        SELECT a.id FROM archive.jobs a
+                        JOIN main.jobs j ON j.id = a.id
+                        WHERE {same})"""
+            ).rowcount
+        with db.transaction() as tx:
+            tx.execute(
+                "DELETE FROM archive.jobs WHERE id IN (SELECT id FROM main.jobs)"
+            )
+            tx.execute("DELETE FROM archive.daily_totals")
+            tx.execute(ROLLUP_SQL.format("archive"))
+            tx.execute("DELETE FROM archive.jobs_fts")
+            tx.execute(FTS_SQL.format("archive"))
+            empty = tx.execute("SELECT NOT EXISTS (SELECT 1 FROM archive.jobs)")
+            empty = empty.fetchone()[0]
+    finally:
+        cx.execute("DETACH DATABASE archive")
+    if empty:
+        part.unlink()
+        return 0
+
+    os.chmod(part, 0o444)
+    os.replace(part, final)
+    if vacuum:
+        cx.execute("VACUUM")
+    return moved
+
+
+def live_years(until: int) -> list[int]:
+    """Anni fino a until che hanno ancora job nel database principale."""
+    rows = db.get_all(
+        "SELECT DISTINCT substr(start_at, 1, 4) AS year FROM jobs "
+        "WHERE start_at < ? ORDER BY year",
+        (f"{until + 1}-01-01",),
+    )
+    return [int(r["year"]) for r in rows]
+
+
+def summary() -> list[dict]:
+    """Anno, numero di job e dimensione di ogni archivio."""
+    rows = []
+    for year in archived_years():
+        path = path_for(year)
+        cx = sqlite3.connect(f"file:{path.resolve()}?mode=ro", uri=True)
+        try:
+            jobs = cx.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+        finally:
+            cx.close()
+        size = f"{path.stat().st_size / 1024:.0f} KiB"
+        rows.append({"year": year, "jobs": jobs, "size": size, "file": str(path)})
+    return rows
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Accesso al database da codice asyncio (TUI, API HTTP, hook).
+
+Le scritture passano tutte da un unico thread. Le richieste si accodano e il
+thread prende insieme quelle arrivate durante il commit precedente, in
+un'unica transazione con un SAVEPOINT per ciascuna: un gruppo paga un solo
+commit, e nello stesso processo nessuno aspetta il lock di scrittura né il
+busy_timeout. Ogni richiesta viene risolta solo dopo il commit del suo gruppo.
+
+Le letture girano su un pool di thread, ognuno con la propria connessione in
+sola lettura di db_connector: in WAL non aspettano lo scrittore.
+
+    adb = AsyncDB()
+    rows = await adb.get_all("SELECT ...", params)
+    job_id = await adb.write(jobs.add_job, day, project, start, end)
+    await adb.transaction(lambda cx: cx.execute("UPDATE ...", params))
+    await adb.close()
+"""
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+
+from controller import db_connector as db
+
+READERS = 4
+MAX_BATCH = 64  # scritture al massimo nella stessa transazione
+
+_STOP = object()
+
+
+class AsyncDB:
+    """Un thread di scrittura con coda e un pool di thread di lettura."""
+
+    def __init__(self, readers: int = READERS, max_batch: int = MAX_BATCH) -> None:
+        self.max_batch = max_batch
+        self.writes = 0
+        self.commits = 0
+        self._closed = False
+        self._queue = queue.SimpleQueue()
+        self._readers = ThreadPoolExecutor(readers, thread_name_prefix="db-read")
+        self._writer = threading.Thread(
+            target=self._write_loop, name="db-write", daemon=True
+        )
+        self._writer.start()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    # letture --------------------------------------------------------------
+
+    async def run(self, fn, *args, **kwargs):
+        """Esegue una funzione di sola lettura (es. del model) sul pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, partial(fn, *args, **kwargs))
+
+    async def get_one(self, sql: str, params: tuple | list = (), row_type=None):
+        return await self.run(db.get_one, sql, params, row_type)
+
+    async def get_all(self, sql: str, params: tuple | list = (), row_type=None):
+        return await self.run(db.get_all, sql, params, row_type)
+
+    async def get_columns(self, sql: str, params: tuple | list = ()):
+        return await self.run(db.get_columns, sql, params)
+
+    # scritture ------------------------------------------------------------
+
+    async def write(self, fn, *args, **kwargs):
+        """Esegue fn sul thread di scrittura e ne ritorna il risultato.
+
+        fn gira dentro la transazione del gruppo: le sue db.transaction()
+        diventano SAVEPOINT e, se solleva, si annullano solo le sue modifiche.
+        """
+        if self._closed:
+            raise RuntimeError("AsyncDB chiuso")
+        future = Future()
+        self._queue.put((partial(fn, *args, **kwargs), future))
+        return await asyncio.wrap_future(future)
+
+    async def transaction(self, fn, *args, **kwargs):
+        """Come db.transaction(): fn(cx, ...) è atomica e il risultato arriva
+        dopo il commit."""
+
+        def call():
+            with db.transaction() as cx:
+                return fn(cx, *args, **kwargs)
+
+        return await self.write(call)
+
+    def _write_loop(self) -> None:
+        try:
+            while True:
+                batch = [self._queue.get()]
+                while batch[-1] is not _STOP and len(batch) < self.max_batch:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = batch[-1] is _STOP
+                if stop:
+                    batch.pop()
+                if batch:
+                    self._commit(batch)
+                if stop:
+                    return
+        finally:
+            # le connessioni del pool appartengono a questo thread
+            db.close_all()
+
+    def _commit(self, batch: list) -> None:
+        done = []
+        try:
+            with db.transaction():
+                for call, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue  # annullata mentre era in coda
+                    try:
+                        with db.transaction():
+                            done.append((future, call(), None))
+                    except Exception as e:
+                        done.append((future, None, e))
+        except Exception as e:
+            # BEGIN o COMMIT falliti: nessuna scrittura del gruppo è stata salvata
+            for _, future in batch:
+                if future.running() or (
+                    not future.cancelled() and future.set_running_or_notify_cancel()
+                ):
+                    future.set_exception(e)
+            return
+        self.writes += len(done)
+        self.commits += 1
+        for future, result, error in done:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    async def close(self) -> None:
+        """Completa le scritture in coda e ferma i thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        await asyncio.to_thread(self._writer.join)
+        self._readers.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Demone locale di chrono su socket Unix (`chrono serve`).
+
+Il demone tiene caldi interprete, import, connessioni del pool e cache di
+lookup, ed esegue i comandi di sola lettura per conto della CLI: chrono.py,
+prima ancora di importare typer, prova forward() e se il socket non risponde
+prosegue con l'accesso diretto al DB.
+
+Il protocollo è una riga JSON per richiesta e una per risposta:
+
+    {"argv": ["report", "-g", "month"], "columns": 120, "color": true}
+    {"code": 0, "stdout": "...", "stderr": "", "ms": 2.1}
+
+così anche gli hook dell'editor possono parlarci con `socat` o `nc -U`.
+Questo modulo importa solo la libreria standard leggera: il lato server carica
+il resto dentro serve().
+"""
+import json
+import os
+import socket
+import sys
+
+SOCKET_PATH = os.environ.get("CHRONO_SOCKET", "controller/chrono.sock")
+# comandi senza prompt che il demone può eseguire al posto della CLI
+FORWARDED = {
+    "report",
+    "analisi",
+    "cerca-job",
+    "lista-clienti",
+    "lista-progetti",
+    "lista-progetti-attivi",
+    "controlla-stato-progetti",
+    "controlla-sovrapposizioni",
+}
+CONNECT_TIMEOUT = 0.5
+
+
+def request(argv: list[str], path: str = SOCKET_PATH) -> dict | None:
+    """Manda argv al demone e ritorna la risposta, o None se non è in ascolto."""
+    try:
+        columns = os.get_terminal_size(sys.stdout.fileno()).columns
+    except (OSError, ValueError):
+        columns = 80
+    payload = {"argv": argv, "columns": columns, "color": sys.stdout.isatty()}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(path)
+        except OSError:
+            return None
+        sock.settimeout(None)
+        sock.sendall(json.dumps(payload).encode() + b"\n")
+        with sock.makefile("rb") as reply:
+            line = reply.readline()
+    return json.loads(line) if line else None
+
+
+def forward(argv: list[str]) -> None:
+    """Esegue argv sul demone ed esce; ritorna se il comando va eseguito qui."""
+    if not argv or argv[0] not in FORWARDED or os.environ.get("CHRONO_NO_DAEMON"):
+        return
+    if not os.path.exists(SOCKET_PATH):
+        return
+    reply = request(argv)
+    if reply is None:
+        return
+    sys.stdout.write(reply["stdout"])
+    sys.stderr.write(reply["stderr"])
+    sys.exit(reply["code"])
+
+
+def _in_use(path: str) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except OSError:
+            return False
+    return True
+
+
+def serve(app, path: str = SOCKET_PATH) -> None:
+    """Ascolta su path finché non riceve SIGINT o SIGTERM."""
+    import asyncio
+    import signal
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    from typer.testing import CliRunner
+
+    from controller import db_connector as db
+
+    if os.path.exists(path):
+        if _in_use(path):
+            raise RuntimeError(f"Un demone è già in ascolto su {path}")
+        os.unlink(path)  # socket rimasto da un demone terminato male
+
+    runner = CliRunner()
+    # un solo thread per il DB: le connessioni del pool restano sue e calde
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db")
+
+    def warm_up():
+        import model.jobs  # noqa: F401
+        import model.reports  # noqa: F401
+        from rich.console import Console  # noqa: F401
+
+        db.connect()
+        db.connect(readonly=True)
+
+    def run(payload: dict) -> dict:
+        start = time.perf_counter()
+        argv = payload.get("argv") or []
+        if not argv or argv[0] not in FORWARDED:
+            return {"code": 2, "stdout": "", "stderr": f"Comando non ammesso: {argv}\n"}
+        env = {"COLUMNS": str(payload.get("columns", 80))}
+        if payload.get("color"):
+            env["FORCE_COLOR"] = "1"
+        result = runner.invoke(
+            app, argv, env=env, color=bool(payload.get("color")), prog_name="chrono"
+        )
+        stderr = result.stderr
+        if result.exception and not isinstance(result.exception, SystemExit):
+            stderr += f"{type(result.exception).__name__}: {result.exception}\n"
+        return {
+            "code": result.exit_code,
+            "stdout": result.stdout,
+            "stderr": stderr,
+            "ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+
+    async def handle(reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while line := await reader.readline():
+                try:
+                    payload = json.loads(line)
+                except json.JSONDecodeError:
+                    reply = {"code": 2, "stdout": "", "stderr": "JSON non valido\n"}
+                else:
+                    reply = await loop.run_in_executor(executor, run, payload)
+                writer.write(json.dumps(reply, ensure_ascii=False).encode() + b"\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(executor, warm_up)
+        server = await asyncio.start_unix_server(handle, path)
+        os.chmod(path, 0o600)
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        async with server:
+            print(f"chrono in ascolto su {path}", flush=True)
+            await stop.wait()
+
+    try:
+        asyncio.run(main())
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+        executor.submit(db.close_all).result()
+        executor.shutdown()
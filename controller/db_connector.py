@@ -1,7 +1,12 @@
 #!/usr/bin/env python3
+import atexit
+import os
+from array import array
 import sqlite3
+import threading
 from pathlib import Path
 from contextlib import contextmanager
+from controller import db_stats, lookup_cache
 
 
 DB_PATH = Path("controller/timesheet.sqlite")
@@ -37,82 +42,736 @@ CREATE TABLE IF NOT EXISTS projects (
   FOREIGN KEY(client_id) REFERENCES clients(id) ON DELETE CASCADE
 );
 
+CREATE TABLE IF NOT EXISTS workdays (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  day TEXT NOT NULL,           -- YYYY-MM-DD
+  notes TEXT,
+  created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+  UNIQUE(day)
+);
+
+CREATE TABLE IF NOT EXISTS work_types (
+  id INTEGER PRIMARY KEY,
+  code TEXT NOT NULL UNIQUE,   -- codice di jobs_tag: 1-16, T, A-K
+  label TEXT NOT NULL,
+  category TEXT NOT NULL,      -- work | travel | wait | out | none
+  billable INTEGER NOT NULL DEFAULT 0
+);
 
 CREATE TABLE IF NOT EXISTS jobs (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
+  workday_id INTEGER NOT NULL,
   project_id INTEGER NOT NULL,
   start_at TEXT NOT NULL,      -- ISO 8601: 2025-11-02T09:30:00
   end_at   TEXT NOT NULL,
   place TEXT,
-  work_type TEXT,
+  work_type_id INTEGER,
   description TEXT,
   created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-  FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE
+  FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE,
+  FOREIGN KEY(work_type_id) REFERENCES work_types(id)
 );
+"""
+
+# Tassonomia dei tipi di lavoro: (id, codice, descrizione, categoria, fatturabile).
+# Gli id sono fissi, così restano uguali in ogni database e in ogni copia.
+WORK_TYPES = [
+    (1, "1", "Fitting & Setting", "work", 1),
+    (2, "2", "Start Up", "work", 1),
+    (3, "3", "Commissioning", "work", 1),
+    (4, "4", "Warranty Work", "work", 1),
+    (5, "5", "Tech Assistance", "work", 1),
+    (6, "6", "Training - Demo", "work", 1),
+    (7, "7", "Test", "work", 1),
+    (8, "8", "Site Survey", "work", 1),
+    (9, "9", "Diagnostic Visit", "work", 1),
+    (10, "10", "Refurbishment", "work", 1),
+    (11, "11", "Option - Upgrade", "work", 1),
+    (12, "12", "Invoiced Work", "work", 1),
+    (13, "13", "Day Off On Job", "work", 0),
+    (14, "14", "Day Off At Home", "work", 0),
+    (15, "15", "Not Chargeable", "work", 0),
+    (16, "16", "Others", "work", 1),
+    (17, "T", "Travel", "travel", 1),
+    (18, "A", "Waiting For End User", "wait", 0),
+    (19, "B", "Waiting For Supplier", "wait", 0),
+    (20, "C", "Waiting For Customer", "wait", 0),
+    (21, "D", "Adjustaments", "out", 0),
+    (22, "E", "Repair", "out", 0),
+    (23, "F", "Problem Research", "out", 0),
+    (24, "G", "Customer Request", "out", 0),
+    (25, "H", "On Site Final Touch", "out", 0),
+    (26, "I", "Work On Ancillary", "out", 0),
+    (27, "J", "MIssing Parts", "out", 0),
+    (28, "K", "Others", "out", 0),
+]
 
-CREATE INDEX IF NOT EXISTS idx_jobs_project ON jobs(project_id);
+# Totali giornalieri mantenuti dai trigger su jobs: i report leggono da qui e il
+# loro costo dipende dal numero di giorni, non dal numero di job.
+JOB_SECONDS = (
+    "CAST(ROUND((julianday({0}.end_at) - julianday({0}.start_at)) * 86400) AS INTEGER)"
+)
+
+ROLLUP_SQL = f"""
+CREATE TABLE IF NOT EXISTS daily_totals (
+  day TEXT NOT NULL,           -- YYYY-MM-DD, giorno di start_at
+  project_id INTEGER NOT NULL,
+  work_type_id INTEGER NOT NULL DEFAULT 0,  -- 0: senza tipo di lavoro
+  seconds INTEGER NOT NULL DEFAULT 0,
+  jobs INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY(day, project_id, work_type_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_daily_totals_project ON daily_totals(project_id, day);
+
+CREATE TRIGGER IF NOT EXISTS trg_jobs_rollup_insert AFTER INSERT ON jobs BEGIN
+  INSERT INTO daily_totals(day, project_id, work_type_id, seconds, jobs)
+  VALUES (date(NEW.start_at), NEW.project_id, IFNULL(NEW.work_type_id, 0), {JOB_SECONDS.format("NEW")}, 1)
+  ON CONFLICT(day, project_id, work_type_id)
+  DO UPDATE SET seconds = seconds + excluded.seconds, jobs = jobs + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_jobs_rollup_delete AFTER DELETE ON jobs BEGIN
+  UPDATE daily_totals
+  SET seconds = seconds - {JOB_SECONDS.format("OLD")}, jobs = jobs - 1
+  WHERE day = date(OLD.start_at) AND project_id = OLD.project_id
+    AND work_type_id = IFNULL(OLD.work_type_id, 0);
+  DELETE FROM daily_totals
+  WHERE day = date(OLD.start_at) AND project_id = OLD.project_id
+    AND work_type_id = IFNULL(OLD.work_type_id, 0) AND jobs <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_jobs_rollup_update
+AFTER UPDATE OF start_at, end_at, project_id, work_type_id ON jobs BEGIN
+  UPDATE daily_totals
+  SET seconds = seconds - {JOB_SECONDS.format("OLD")}, jobs = jobs - 1
+  WHERE day = date(OLD.start_at) AND project_id = OLD.project_id
+    AND work_type_id = IFNULL(OLD.work_type_id, 0);
+  DELETE FROM daily_totals
+  WHERE day = date(OLD.start_at) AND project_id = OLD.project_id
+    AND work_type_id = IFNULL(OLD.work_type_id, 0) AND jobs <= 0;
+  INSERT INTO daily_totals(day, project_id, work_type_id, seconds, jobs)
+  VALUES (date(NEW.start_at), NEW.project_id, IFNULL(NEW.work_type_id, 0), {JOB_SECONDS.format("NEW")}, 1)
+  ON CONFLICT(day, project_id, work_type_id)
+  DO UPDATE SET seconds = seconds + excluded.seconds, jobs = jobs + 1;
+END;
 """
 
+# Indice a intervalli (R*Tree) su inizio/fine dei job in secondi epoch, per
+# trovare le sovrapposizioni in O(log n). Le coordinate R*Tree sono float a 32
+# bit arrotondati verso l'esterno: il risultato va ricontrollato sui job.
+EPOCH = "CAST(strftime('%s', {0}) AS INTEGER)"
+
+INTERVALS_SQL = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS jobs_intervals USING rtree(id, start_epoch, end_epoch);
+
+CREATE TRIGGER IF NOT EXISTS trg_jobs_intervals_insert AFTER INSERT ON jobs BEGIN
+  INSERT INTO jobs_intervals(id, start_epoch, end_epoch)
+  VALUES (NEW.id, {EPOCH.format("NEW.start_at")}, {EPOCH.format("NEW.end_at")});
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_jobs_intervals_delete AFTER DELETE ON jobs BEGIN
+  DELETE FROM jobs_intervals WHERE id = OLD.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_jobs_intervals_update
+AFTER UPDATE OF start_at, end_at ON jobs BEGIN
+  UPDATE jobs_intervals
+  SET start_epoch = {EPOCH.format("NEW.start_at")}, end_epoch = {EPOCH.format("NEW.end_at")}
+  WHERE id = NEW.id;
+END;
+"""
 
-def connect(db_path=DB_PATH, timeout=5.0):
-    conn = sqlite3.connect(
-        db_path,
+REBUILD_INTERVALS_SQL = f"""
+INSERT INTO jobs_intervals(id, start_epoch, end_epoch)
+SELECT id, {EPOCH.format("start_at")}, {EPOCH.format("end_at")} FROM jobs
+"""
+
+# Ricerca full-text su descrizione, luogo e tipo di lavoro (codice e
+# descrizione). Tabella a contenuto esterno: il testo resta in jobs e
+# work_types, letto dalla vista jobs_search; l'indice lo allineano i trigger.
+WORK_TYPE_TEXT = (
+    "(SELECT w.code || ' ' || w.label FROM work_types w WHERE w.id = {0}.work_type_id)"
+)
+
+SEARCH_SQL = f"""
+CREATE VIEW IF NOT EXISTS jobs_search AS
+SELECT j.id, j.description, j.place, {WORK_TYPE_TEXT.format("j")} AS work_type
+FROM jobs j;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5(
+  description, place, work_type,
+  content = 'jobs_search', content_rowid = 'id',
+  tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_jobs_fts_insert AFTER INSERT ON jobs BEGIN
+  INSERT INTO jobs_fts(rowid, description, place, work_type)
+  VALUES (NEW.id, NEW.description, NEW.place, {WORK_TYPE_TEXT.format("NEW")});
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_jobs_fts_delete AFTER DELETE ON jobs BEGIN
+  INSERT INTO jobs_fts(jobs_fts, rowid, description, place, work_type)
+  VALUES ('delete', OLD.id, OLD.description, OLD.place, {WORK_TYPE_TEXT.format("OLD")});
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_jobs_fts_update
+AFTER UPDATE OF description, place, work_type_id ON jobs BEGIN
+  INSERT INTO jobs_fts(jobs_fts, rowid, description, place, work_type)
+  VALUES ('delete', OLD.id, OLD.description, OLD.place, {WORK_TYPE_TEXT.format("OLD")});
+  INSERT INTO jobs_fts(rowid, description, place, work_type)
+  VALUES (NEW.id, NEW.description, NEW.place, {WORK_TYPE_TEXT.format("NEW")});
+END;
+"""
+
+REBUILD_ROLLUP_SQL = f"""
+INSERT INTO daily_totals(day, project_id, work_type_id, seconds, jobs)
+SELECT date(j.start_at), j.project_id, IFNULL(j.work_type_id, 0),
+       SUM({JOB_SECONDS.format("j")}), COUNT(*)
+FROM jobs j
+GROUP BY 1, 2, 3
+"""
+
+# Caricamenti in blocco (model.jobs.add_jobs con deferred): i trigger di
+# inserimento su jobs restano sospesi e le tabelle derivate si aggiornano per i
+# job con id > ? con una query ciascuna, invece che una per job.
+INSERT_TRIGGERS = (
+    "trg_jobs_rollup_insert",
+    "trg_jobs_intervals_insert",
+    "trg_jobs_fts_insert",
+)
+
+APPEND_ROLLUP_SQL = f"""
+INSERT INTO daily_totals(day, project_id, work_type_id, seconds, jobs)
+SELECT date(j.start_at), j.project_id, IFNULL(j.work_type_id, 0),
+       SUM({JOB_SECONDS.format("j")}), COUNT(*)
+FROM jobs j
+WHERE j.id > ?
+GROUP BY 1, 2, 3
+ON CONFLICT(day, project_id, work_type_id)
+DO UPDATE SET seconds = seconds + excluded.seconds, jobs = jobs + excluded.jobs
+"""
+
+APPEND_INTERVALS_SQL = f"""
+INSERT INTO jobs_intervals(id, start_epoch, end_epoch)
+SELECT id, {EPOCH.format("start_at")}, {EPOCH.format("end_at")} FROM jobs
+WHERE id > ?
+"""
+
+APPEND_SEARCH_SQL = """
+INSERT INTO jobs_fts(rowid, description, place, work_type)
+SELECT id, description, place, work_type FROM jobs_search
+WHERE id > ?
+"""
+
+# Indici per le ricerche per nome (NOCASE) e per i report su intervalli di date.
+# Idempotenti: init_db li aggiunge anche ai database già esistenti.
+INDEXES_SQL = """
+CREATE INDEX IF NOT EXISTS idx_clients_name ON clients(name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_clients_city ON clients(city COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_projects_name ON projects(name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_projects_active_name ON projects(active, name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_jobs_workday ON jobs(workday_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_project_range ON jobs(project_id, start_at, end_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_range ON jobs(start_at, end_at, project_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_work_type ON jobs(work_type_id);
+
+-- coperto da idx_jobs_project_range
+DROP INDEX IF EXISTS idx_jobs_project;
+-- sostituito da idx_projects_active_name (ordinamento NOCASE delle liste)
+DROP INDEX IF EXISTS idx_projects_active;
+"""
+
+# Colonne testuali: confrontate senza distinguere maiuscole/minuscole
+NOCASE = {
+    "clients": {"name", "city", "nation"},
+    "projects": {"name"},
+    "workdays": {"day"},
+}
+
+
+# Connessioni riusabili per tutto il processo: una in scrittura e una in sola
+# lettura per ogni DB e thread (sqlite3 non condivide le connessioni tra thread).
+_pool = threading.local()
+
+CACHED_STATEMENTS = 256
+
+
+def _open(db_path, timeout, readonly):
+    target = f"file:{Path(db_path).resolve()}?mode=ro" if readonly else db_path
+    cx = sqlite3.connect(
+        target,
+        uri=readonly,
         timeout=timeout,
         isolation_level=None,
         detect_types=sqlite3.PARSE_DECLTYPES,
+        cached_statements=CACHED_STATEMENTS,
+        # con la strumentazione spenta resta la connessione standard
+        factory=db_stats.TimedConnection if db_stats.active() else sqlite3.Connection,
     )
-    conn.row_factory = sqlite3.Row
+    db_stats.connection_opened()
+    cx.row_factory = sqlite3.Row
+
+    # PRAGMA impostati una volta sola, all'apertura della connessione
+    cx.execute("PRAGMA foreign_keys = ON;")
+    if not readonly:
+        cx.execute("PRAGMA journal_mode = WAL;")
+        cx.execute("PRAGMA synchronous = NORMAL;")  # bilancia durabilità/performance
+    cx.execute("PRAGMA busy_timeout = 5000;")  # evita Immediate 'database is locked'
+
+    return cx
+
+
+def _connections() -> dict:
+    # dopo un fork le connessioni del processo padre non vanno riusate
+    if getattr(_pool, "pid", None) != os.getpid():
+        _pool.pid = os.getpid()
+        _pool.conns = {}
+        _pool.data_version = None
+    return _pool.conns
+
+
+def connect(db_path=None, timeout=5.0, readonly=False):
+    """Ritorna una connessione già aperta dal pool (la crea alla prima richiesta)."""
+    db_path = db_path or DB_PATH
+    conns = _connections()
+    key = (str(db_path), readonly)
+    cx = conns.get(key)
+    if cx is None:
+        try:
+            cx = _open(db_path, timeout, readonly)
+        except sqlite3.OperationalError:
+            if not readonly:
+                raise
+            # DB non ancora creato: si legge dalla connessione in scrittura
+            cx = connect(db_path, timeout)
+        conns[key] = cx
+    return cx
 
-    # PRAGMA da impostare a ogni connessione
-    conn.execute("PRAGMA foreign_keys = ON;")
-    conn.execute("PRAGMA journal_mode = WAL;")
-    conn.execute("PRAGMA synchronous = NORMAL;")  # bilancia durabilità/performance
-    conn.execute("PRAGMA busy_timeout = 5000;")  # evita Immediate 'database is locked'
 
-    return conn
+def close_all():
+    conns = _connections()
+    for cx in conns.values():
+        cx.close()
+    conns.clear()
+    _pool.data_version = None
+
+
+atexit.register(close_all)
+
+
+def enable_stats(slow_ms: float = db_stats.SLOW_MS):
+    """Attiva la strumentazione; le connessioni vengono riaperte strumentate."""
+    close_all()
+    return db_stats.enable(slow_ms)
 
 
 @contextmanager
 def transaction():
+    """Transazione sulla connessione in scrittura del thread.
+
+    Dentro un'altra transazione dello stesso thread diventa un SAVEPOINT: se
+    fallisce annulla solo le proprie modifiche e le proprie callback di
+    on_commit, e il commit resta a quella esterna (vedi async_db).
+    """
     cx = connect()
+    callbacks = getattr(_pool, "after_commit", None)
+    if callbacks is not None:
+        mark = len(callbacks)
+        cx.execute("SAVEPOINT nested")
+        try:
+            yield cx
+        except:
+            cx.execute("ROLLBACK TO nested")
+            cx.execute("RELEASE nested")
+            del callbacks[mark:]
+            raise
+        cx.execute("RELEASE nested")
+        return
+    # IMMEDIATE: il lock di scrittura si prende subito, con busy_timeout; una
+    # transazione differita che legge e poi scrive fallisce senza attesa
+    # ("database is locked") se un altro processo ha fatto commit nel frattempo
+    cx.execute("BEGIN IMMEDIATE")
+    _pool.after_commit = callbacks = []
     try:
-        cx.execute("BEGIN")
         yield cx
         cx.execute("COMMIT")
     except:
         cx.execute("ROLLBACK")
         raise
     finally:
-        cx.close()
+        _pool.after_commit = None
+    for fn in callbacks:
+        fn()
+
+
+def on_commit(fn):
+    """Esegue fn al commit della transazione in corso (subito se non ce n'è una)."""
+    callbacks = getattr(_pool, "after_commit", None)
+    if callbacks is None:
+        fn()
+    else:
+        callbacks.append(fn)
+
+
+_generation = 0
+_generation_lock = threading.Lock()
+# connessione riservata a generation(), condivisa dai thread sotto il lock
+_version_cx = None
+_version_key = None
+_data_version = None
+
+
+def _version_connection(db_path):
+    path = Path(db_path).resolve()
+    try:
+        return sqlite3.connect(
+            f"file:{path}?mode=ro", uri=True, check_same_thread=False
+        )
+    except sqlite3.OperationalError:
+        # DB non ancora creato
+        return sqlite3.connect(path, check_same_thread=False)
+
+
+def generation() -> int:
+    """Contatore di processo che cambia quando il database riceve un commit.
+
+    Legge PRAGMA data_version da un'unica connessione riservata, condivisa da
+    tutti i thread sotto un lock: cambia per i commit di ogni altra
+    connessione, anche di questo processo, e un commit fa avanzare il
+    contatore una volta sola, qualunque thread se ne accorga per primo.
+    """
+    global _generation, _version_cx, _version_key, _data_version
+    key = (os.getpid(), str(DB_PATH))
+    with _generation_lock:
+        if _version_key != key:
+            # dopo un fork o un cambio di DB_PATH la connessione va riaperta
+            _version_cx = _version_connection(DB_PATH)
+            _version_key = key
+            _data_version = None
+        version = _version_cx.execute("PRAGMA data_version").fetchone()[0]
+        if version != _data_version:
+            _generation += 1
+            _data_version = version
+        return _generation
+
+
+def lookup(cache, key, load):
+    """Ricerca attraverso una cache di lookup_cache.
+
+    I commit di questo processo invalidano le voci che toccano attraverso
+    on_commit. Quelli degli altri processi li segnala PRAGMA data_version della
+    connessione in scrittura del thread, che non cambia per i suoi commit:
+    in quel caso si svuotano tutte le cache.
+    """
+    version = connect().execute("PRAGMA data_version").fetchone()[0]
+    if _pool.data_version != version:
+        lookup_cache.clear()
+        _pool.data_version = version
+    return cache.get(key, load)
+
+
+def _has_table(cx, name):
+    sql = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?"
+    return cx.execute(sql, (name,)).fetchone() is not None
+
+
+def _has_column(cx, table, name):
+    return any(r["name"] == name for r in cx.execute(f"PRAGMA table_info({table})"))
 
 
 def init_db():
-    with connect() as cx:
-        cx.executescript(SCHEMA_SQL)
+    """Crea il database o lo porta all'ultima versione dello schema."""
+    from controller import migrations
+
+    migrations.migrate()
+
+
+@contextmanager
+def deferred_insert_triggers(cx, intervals: bool = True):
+    """Sospende i trigger di INSERT_TRIGGERS dentro la transazione in corso.
+
+    Rende l'id più alto di jobs all'ingresso; all'uscita aggiorna le tabelle
+    derivate per i job inseriti dopo e rimette i trigger. Con intervals=False
+    jobs_intervals lo aggiorna il chiamante (APPEND_INTERVALS_SQL), ad esempio
+    dopo ogni blocco per controllare le sovrapposizioni tra un blocco e
+    l'altro. Tutto avviene prima del commit: gli altri processi non vedono mai
+    lo schema senza trigger.
+    """
+    if getattr(_pool, "after_commit", None) is None:
+        raise RuntimeError("deferred_insert_triggers va usato dentro transaction()")
+    marks = ",".join("?" * len(INSERT_TRIGGERS))
+    triggers = cx.execute(
+        "SELECT name, sql FROM sqlite_master "
+        f"WHERE type = 'trigger' AND name IN ({marks})",
+        INSERT_TRIGGERS,
+    ).fetchall()
+    last_id = cx.execute("SELECT IFNULL(MAX(id), 0) FROM jobs").fetchone()[0]
+    for t in triggers:
+        cx.execute(f"DROP TRIGGER {t['name']}")
+    yield last_id
+    if intervals:
+        cx.execute(APPEND_INTERVALS_SQL, (last_id,))
+    cx.execute(APPEND_ROLLUP_SQL, (last_id,))
+    cx.execute(APPEND_SEARCH_SQL, (last_id,))
+    for t in triggers:
+        cx.execute(t["sql"])
+
+
+def rebuild_rollup():
+    """Ricalcola daily_totals da zero a partire da jobs."""
+    with transaction() as cx:
+        cx.execute("DELETE FROM daily_totals")
+        cx.execute(REBUILD_ROLLUP_SQL)
+
+
+def rebuild_intervals():
+    """Ricalcola l'indice a intervalli jobs_intervals a partire da jobs."""
+    with transaction() as cx:
+        cx.execute("DELETE FROM jobs_intervals")
+        cx.execute(REBUILD_INTERVALS_SQL)
+
+
+def rebuild_search():
+    """Ricostruisce l'indice full-text jobs_fts a partire da jobs."""
+    with transaction() as cx:
+        cx.execute("INSERT INTO jobs_fts(jobs_fts) VALUES ('rebuild')")
+
+
+def migrate_indexes():
+    cx = connect()
+    cx.executescript(INDEXES_SQL)
+    cx.execute("PRAGMA optimize;")
+
+
+def query_plan(sql: str, params: tuple | list = ()) -> list[str]:
+    """Dettagli di EXPLAIN QUERY PLAN per una query."""
+    cx = connect(readonly=True)
+    return [r["detail"] for r in cx.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
 
 
 def exist(table: str, column: str, value):
-    query = f"SELECT 1 FROM {table} WHERE {column} = ? COLLATE NOCASE LIMIT 1;"
     if table not in ALLOWED or column not in ALLOWED[table]:
         raise ValueError(f"Tabella/colonna non ammessa: {table}.{column}")
-    with connect() as cx:
-        row = cx.execute(query, (value,)).fetchone()
-        return row is not None
+    nocase = column in NOCASE.get(table, ())
+    collate = " COLLATE NOCASE" if nocase else ""
+    query = f"SELECT 1 FROM {table} WHERE {column} = ?{collate} LIMIT 1;"
+
+    def load():
+        row = connect(readonly=True).execute(query, (value,)).fetchone()
+        return True if row else None
+
+    if table not in ("clients", "projects"):
+        return load() is not None
+    key = (table, column, value.lower() if nocase and isinstance(value, str) else value)
+    return lookup(lookup_cache.EXISTS, key, load) is not None
+
+
+def work_types() -> list[dict]:
+    """Righe di work_types in ordine di id; in cache fino al prossimo commit
+    di un'altra connessione."""
+
+    def load():
+        sql = "SELECT id, code, label, category, billable FROM work_types ORDER BY id"
+        return [dict(r) for r in connect(readonly=True).execute(sql)]
+
+    return lookup(lookup_cache.WORK_TYPES, "all", load)
+
+
+class Record:
+    """Base delle righe tipizzate del model (dataclass con slots).
+
+    Costano molto meno di un dict ma si leggono anche come mapping, r["campo"],
+    quindi tabelle, TUI ed export le trattano come le righe dict.
+    """
+
+    __slots__ = ()
+
+    def keys(self):
+        return self.__match_args__
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+
+class Columns:
+    """Risultato per colonne: array.array per le colonne numeriche, lista per
+    le altre. rows["hours"] è una colonna, rows[i] la riga i come dict."""
 
+    __slots__ = ("names", "columns", "_index")
 
-def get_one(sql: str, params: tuple | list = ()) -> dict:
-    with connect() as cx:
-        rows = cx.execute(sql, params).fetchone()
-        return dict(rows) if rows else {}
+    def __init__(self, names: list[str], columns: list) -> None:
+        self.names = names
+        self.columns = columns
+        self._index = {name: i for i, name in enumerate(names)}
 
+    def __len__(self) -> int:
+        return len(self.columns[0]) if self.columns else 0
 
-def get_all(sql: str, params: tuple | list = ()) -> list[dict]:
-    with connect() as cx:
-        return [dict(row) for row in cx.execute(sql, params).fetchall()]
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.columns[self._index[key]]
+        return {name: col[key] for name, col in zip(self.names, self.columns)}
 
+    def __iter__(self):
+        for values in zip(*self.columns):
+            yield dict(zip(self.names, values))
+
+
+def _compact(values: list):
+    if all(type(v) is int for v in values):
+        return array("q", values)
+    if all(type(v) in (int, float) for v in values):
+        return array("d", values)
+    return values
+
+
+def jsonable(value):
+    """default= per json.dumps: Record come oggetto, Columns come lista di righe."""
+    if isinstance(value, Record):
+        return {key: value[key] for key in value.keys()}
+    if isinstance(value, Columns):
+        return list(value)
+    raise TypeError(f"{type(value).__name__} non serializzabile in JSON")
+
+
+def _cursor(sql, params, row_type=None):
+    cur = connect(readonly=True).cursor()
+    cur.execute(sql, params)
+    if row_type is not None:
+        # la riga diventa subito un'istanza di row_type, senza dict intermedi:
+        # posizionale se le colonne seguono l'ordine dei campi
+        names = tuple(d[0] for d in cur.description)
+        if names == row_type.__match_args__[: len(names)]:
+            cur.row_factory = lambda _, row: row_type(*row)
+        else:
+            cur.row_factory = lambda _, row: row_type(**dict(zip(names, row)))
+    return cur
+
+
+def get_one(sql: str, params: tuple | list = (), row_type=None):
+    """Prima riga come dict (vuoto se non c'è) o come row_type (None se non c'è)."""
+    row = _cursor(sql, params, row_type).fetchone()
+    if row_type is not None:
+        return row
+    return dict(row) if row else {}
+
+
+def get_all(sql: str, params: tuple | list = (), row_type=None) -> list:
+    cur = _cursor(sql, params, row_type)
+    if row_type is not None:
+        return cur.fetchall()
+    return [dict(row) for row in cur.fetchall()]
+
+
+def get_columns(sql: str, params: tuple | list = (), size: int = 1000) -> Columns:
+    """Come get_all ma per colonne: nessun oggetto per riga resta in memoria."""
+    cur = connect(readonly=True).cursor()
+    cur.row_factory = None
+    cur.execute(sql, params)
+    names = [d[0] for d in cur.description]
+    columns = [[] for _ in names]
+    while rows := cur.fetchmany(size):
+        for column, values in zip(columns, zip(*rows)):
+            column.extend(values)
+    return Columns(names, [_compact(column) for column in columns])
+
+
+def iter_all(sql: str, params: tuple | list = (), size: int = 1000, row_type=None):
+    """Come get_all ma a blocchi di `size` righe: la memoria resta costante."""
+    cur = _cursor(sql, params, row_type)
+    try:
+        while rows := cur.fetchmany(size):
+            for row in rows:
+                yield row if row_type is not None else dict(row)
+    finally:
+        cur.close()
+
+
+BACKUP_DIR = Path("controller/backups")
+BACKUP_KEEP = 14
+# pagine copiate per passo: tra un passo e l'altro gli scrittori non aspettano
+BACKUP_PAGES = 1024
+
+
+def backup(target_path: Path, pages: int = BACKUP_PAGES, progress=None, sleep=0.0):
+    """Backup 'a caldo' con l'API di backup di SQLite, `pages` pagine per passo.
+
+    La sorgente tiene aperta una transazione di lettura per tutta la copia: in
+    WAL gli scrittori proseguono e la copia resta coerente con l'istante di
+    inizio, invece di ripartire da capo a ogni commit. progress(copiate, totale)
+    viene chiamato dopo ogni passo.
+    """
+    def step(status, remaining, total):
+        progress(total - remaining, total)
+
+    src = sqlite3.connect(f"file:{Path(DB_PATH).resolve()}?mode=ro", uri=True)
+    dst = sqlite3.connect(target_path)
+    try:
+        src.execute("BEGIN")
+        src.execute("SELECT count(*) FROM sqlite_master").fetchone()
+        src.backup(dst, pages=pages, progress=progress and step, sleep=sleep)
+        src.execute("COMMIT")
+        # la copia eredita il WAL: la si riporta a un file unico e autosufficiente
+        dst.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        dst.close()
+        src.close()
+    return Path(target_path)
+
+
+def _integrity_check(path: Path) -> str:
+    cx = sqlite3.connect(f"file:{Path(path).resolve()}?mode=ro", uri=True)
+    try:
+        return "; ".join(r[0] for r in cx.execute("PRAGMA integrity_check"))
+    finally:
+        cx.close()
+
+
+def snapshot(
+    dest_dir: Path = BACKUP_DIR,
+    keep: int = BACKUP_KEEP,
+    pages: int = BACKUP_PAGES,
+    progress=None,
+) -> Path:
+    """Backup compresso e verificato in dest_dir; tiene solo gli ultimi `keep`.
+
+    La copia passa da integrity_check prima di essere compressa con gzip, così
+    in dest_dir finiscono solo archivi sani. Ritorna il percorso dell'archivio.
+    """
+    import gzip
+    import shutil
+    from datetime import datetime
+
+    from controller import errors as er
+
+    dest_dir = Path(dest_dir)
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    archive = dest_dir / f"{Path(DB_PATH).stem}-{stamp}.sqlite.gz"
+    copy = archive.with_suffix(".part")
+    partial = archive.with_name(archive.name + ".part")
+    try:
+        backup(copy, pages=pages, progress=progress)
+        result = _integrity_check(copy)
+        if result != "ok":
+            raise er.BackupCorrupted(archive, result)
+        with open(copy, "rb") as fin, gzip.open(partial, "wb", compresslevel=6) as fout:
+            shutil.copyfileobj(fin, fout, 1 << 20)
+        partial.replace(archive)
+    finally:
+        copy.unlink(missing_ok=True)
+        partial.unlink(missing_ok=True)
 
-def backup(target_path: Path):
-    """Backup 'a caldo' sicuro con .backup di SQLite."""
-    import subprocess
+    # i nomi contengono il timestamp: l'ordine alfabetico è quello cronologico
+    old = sorted(dest_dir.glob(f"{Path(DB_PATH).stem}-*.sqlite.gz"))[:-keep]
+    for path in old:
+        path.unlink()
+    return archive
 
-    subprocess.run(["sqlite3", str(DB_PATH), f".backup '{target_path}'"], check=True)
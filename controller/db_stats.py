@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""Strumentazione opzionale delle query SQLite, disattivata di default.
+
+Si attiva con la variabile d'ambiente CHRONO_DB_STATS=1 (o con
+db_connector.enable_stats). Da attiva, le connessioni del pool usano un cursore
+che cronometra ogni esecuzione e ogni fetch, conta le righe e segnala sul
+logger "chrono.db" le istruzioni più lente di CHRONO_SLOW_MS millisecondi.
+All'uscita le statistiche vengono sommate in STATS_PATH, letto dal comando
+`statistiche-db`. Da spenta il costo è un controllo su una variabile globale
+all'apertura delle connessioni.
+"""
+import atexit
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import sqlite3
+from pathlib import Path
+
+STATS_PATH = Path(
+    os.environ.get("CHRONO_DB_STATS_FILE", "controller/db_stats.json")
+)
+SLOW_MS = float(os.environ.get("CHRONO_SLOW_MS", 100))
+MAX_SLOW = 100
+
+log = logging.getLogger("chrono.db")
+
+
+class Stats:
+    def __init__(self, slow_ms: float = SLOW_MS) -> None:
+        self.slow_s = slow_ms / 1000
+        self.statements = {}  # sql -> [chiamate, secondi, righe, max secondi]
+        self.connections = 0
+        self.slow = []
+        self._lock = threading.Lock()
+
+    def add(self, sql: str, elapsed: float, rows: int, call: bool) -> None:
+        with self._lock:
+            entry = self.statements.setdefault(sql, [0, 0.0, 0, 0.0])
+            entry[0] += call
+            entry[1] += elapsed
+            entry[2] += rows
+            entry[3] = max(entry[3], elapsed)
+
+    def slow_query(self, sql: str, elapsed: float) -> None:
+        log.warning("query lenta (%.1f ms): %s", elapsed * 1000, sql)
+        with self._lock:
+            self.slow.append({"sql": sql, "ms": round(elapsed * 1000, 3)})
+            del self.slow[:-MAX_SLOW]
+
+    def top(self, n: int = 10) -> list[dict]:
+        """Le n istruzioni con il tempo totale più alto."""
+        rows = [
+            {
+                "sql": sql,
+                "calls": calls,
+                "total_ms": round(seconds * 1000, 3),
+                "max_ms": round(longest * 1000, 3),
+                "rows": nrows,
+            }
+            for sql, (calls, seconds, nrows, longest) in self.statements.items()
+        ]
+        return sorted(rows, key=lambda r: r["total_ms"], reverse=True)[:n]
+
+
+_stats: Stats | None = None
+
+
+def active() -> Stats | None:
+    return _stats
+
+
+def enable(slow_ms: float = SLOW_MS) -> Stats:
+    global _stats
+    if _stats is None:
+        _stats = Stats(slow_ms)
+        atexit.register(save)
+    return _stats
+
+
+def disable() -> None:
+    global _stats
+    _stats = None
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursore che somma tempo e righe di ogni istruzione nelle statistiche."""
+
+    _sql = ""
+    _elapsed = 0.0
+
+    def _account(self, start: float, rows: int, call: bool = False) -> None:
+        stats = _stats
+        if stats is None:
+            return
+        elapsed = time.perf_counter() - start
+        stats.add(self._sql, elapsed, rows, call)
+        before = self._elapsed
+        self._elapsed += elapsed
+        if before <= stats.slow_s < self._elapsed:
+            stats.slow_query(self._sql, self._elapsed)
+
+    def _begin(self, sql: str) -> float:
+        self._sql = " ".join(sql.split())
+        self._elapsed = 0.0
+        return time.perf_counter()
+
+    def execute(self, sql, parameters=(), /):
+        start = self._begin(sql)
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._account(start, max(self.rowcount, 0), call=True)
+
+    def executemany(self, sql, seq_of_parameters, /):
+        start = self._begin(sql)
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._account(start, max(self.rowcount, 0), call=True)
+
+    def executescript(self, sql_script, /):
+        start = self._begin(sql_script)
+        try:
+            return super().executescript(sql_script)
+        finally:
+            self._account(start, 0, call=True)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._account(start, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._account(start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._account(start, len(rows))
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._account(start, 0)
+            raise
+        self._account(start, 1)
+        return row
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connessione i cui cursori sono TimedCursor.
+
+    Le scorciatoie execute* vanno ridefinite: quelle di sqlite3.Connection creano
+    il cursore in C senza passare da cursor().
+    """
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=(), /):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters, /):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script, /):
+        return self.cursor().executescript(sql_script)
+
+
+def connection_opened() -> None:
+    if _stats is not None:
+        with _stats._lock:
+            _stats.connections += 1
+
+
+def load(path: Path = STATS_PATH) -> dict:
+    try:
+        return json.loads(Path(path).read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"commands": {}, "statements": {}, "slow": []}
+
+
+def save(path: Path = STATS_PATH) -> None:
+    """Somma le statistiche del processo in corso a quelle già salvate."""
+    stats = _stats
+    if stats is None or not stats.statements:
+        return
+    data = load(path)
+    command = sys.argv[1] if len(sys.argv) > 1 else "-"
+    run = data["commands"].setdefault(command, {"runs": 0, "connections": 0})
+    run["runs"] += 1
+    run["connections"] += stats.connections
+    for sql, (calls, seconds, rows, longest) in stats.statements.items():
+        entry = data["statements"].setdefault(
+            sql, {"calls": 0, "seconds": 0.0, "rows": 0, "max_seconds": 0.0}
+        )
+        entry["calls"] += calls
+        entry["seconds"] += seconds
+        entry["rows"] += rows
+        entry["max_seconds"] = max(entry["max_seconds"], longest)
+    data["slow"] = (data["slow"] + stats.slow)[-MAX_SLOW:]
+    Path(path).write_text(json.dumps(data, indent=1, ensure_ascii=False))
+
+
+if os.environ.get("CHRONO_DB_STATS"):
+    enable()
@@ -70,6 +70,13 @@ class JobNotFound(AppError):
         super().__init__(msg)
 
 
+class WorkTypeNotFound(AppError):
+    def __init__(self, code):
+        self.code = code
+        msg = f"Il tipo di lavoro '{code}' non è tra quelli di work_types"
+        super().__init__(msg)
+
+
 class PlantNotFound(AppError):
     def __init__(self, customer, city) -> None:
         self.customer = customer
@@ -84,3 +91,26 @@ class MultiPlantFound(AppError):
         self.cities = cities
         msg = f"Ho trovato più città in cui {name} ha dei plant"
         super().__init__(msg)
+
+
+## CONFLICT
+
+
+class JobOverlap(AppError):
+    def __init__(self, start_at, end_at, other_id) -> None:
+        self.start_at = start_at
+        self.end_at = end_at
+        self.other_id = other_id
+        msg = f"Il job {start_at} → {end_at} si sovrappone al job {other_id}"
+        super().__init__(msg)
+
+
+## BACKUP
+
+
+class BackupCorrupted(AppError):
+    def __init__(self, path, result) -> None:
+        self.path = path
+        self.result = result
+        msg = f"Il backup '{path}' non supera integrity_check: {result}"
+        super().__init__(msg)
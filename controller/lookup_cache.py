@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Cache LRU in processo per le ricerche per nome di progetti e clienti.
+
+Le voci vengono invalidate in due modi: le funzioni del model che modificano
+clienti e progetti chiamano clients_changed/project_changed a commit avvenuto
+(db_connector.on_commit), e db_connector.lookup svuota tutto quando
+PRAGMA data_version segnala commit fatti da altre connessioni.
+Le ricerche senza risultato non vengono memorizzate.
+"""
+import threading
+from collections import OrderedDict
+
+MAXSIZE = 1024
+
+_MISSING = object()
+
+
+class LRU:
+    def __init__(self, maxsize: int = MAXSIZE) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        # cambia a ogni invalidazione: un caricamento iniziato prima non si salva
+        self._generation = 0
+
+    def get(self, key, load):
+        """Valore in cache per key, altrimenti lo calcola con load()."""
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is not _MISSING:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+            generation = self._generation
+        value = load()
+        if value is not None:
+            with self._lock:
+                if generation == self._generation:
+                    self._data[key] = value
+                    if len(self._data) > self.maxsize:
+                        self._data.popitem(last=False)
+        return value
+
+    def discard(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+            self._generation += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# nome progetto (minuscolo) -> {"id", "client", "place"}
+PROJECTS = LRU()
+# (nome, città) -> id cliente
+CLIENTS = LRU()
+# (tabella, colonna, valore) -> True, per db_connector.exist
+EXISTS = LRU()
+# "all" -> righe di work_types; chiave di categoria -> {codice: descrizione}
+WORK_TYPES = LRU()
+
+
+def clear() -> None:
+    for cache in (PROJECTS, CLIENTS, EXISTS, WORK_TYPES):
+        cache.clear()
+
+
+def clients_changed() -> None:
+    # i progetti memorizzano nome e città del cliente: si svuota tutto
+    clear()
+
+
+def project_changed(name: str) -> None:
+    PROJECTS.discard(name.lower())
+    EXISTS.clear()
+
+
+def stats() -> dict:
+    return {
+        name: {"size": len(cache), "hits": cache.hits, "misses": cache.misses}
+        for name, cache in (
+            ("projects", PROJECTS),
+            ("clients", CLIENTS),
+            ("exists", EXISTS),
+            ("work_types", WORK_TYPES),
+        )
+    }
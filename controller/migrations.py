@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""Migrazioni numerate dello schema (`chrono migra`, `chrono init-database`).
+
+PRAGMA user_version contiene il numero dell'ultima migrazione applicata e le
+migrazioni mancanti si applicano in ordine. Ogni passo controlla da sé se serve,
+quindi un database creato con lo schema corrente ma ancora a versione 0 le
+attraversa senza modifiche.
+
+I passi che spostano dati lavorano su blocchi di id di jobs, ognuno nella sua
+transazione breve: gli altri processi continuano a leggere e a scrivere tra un
+blocco e l'altro. L'avanzamento viene salvato in schema_migrations nella stessa
+transazione del blocco, così una migrazione interrotta riparte dal blocco dopo.
+"""
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from controller import db_connector as db
+from controller import lookup_cache
+
+BATCH_SIZE = 5000
+
+PROGRESS_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+  version INTEGER PRIMARY KEY,
+  last_id INTEGER NOT NULL DEFAULT 0,  -- ultimo id di jobs già migrato
+  max_id INTEGER NOT NULL DEFAULT 0,   -- id più alto all'avvio della migrazione
+  started_at TEXT DEFAULT CURRENT_TIMESTAMP,
+  finished_at TEXT
+)
+"""
+
+
+@dataclass
+class Migration:
+    """Un passo dello schema.
+
+    Senza batch, run(cx) viene eseguito fuori transazione e deve essere
+    idempotente. Con batch: prepare(cx) in una transazione, poi
+    batch(cx, dopo_id, fino_a_id) per ogni blocco di jobs esistente all'avvio,
+    poi finish(cx) nella transazione che aggiorna user_version.
+    """
+
+    version: int
+    description: str
+    needed: Callable = lambda cx: True
+    run: Callable | None = None
+    prepare: Callable | None = None
+    batch: Callable | None = None
+    finish: Callable | None = None
+
+
+# 1 -------------------------------------------------------------------------
+
+
+def _base_schema(cx):
+    cx.executescript(db.SCHEMA_SQL)
+    cx.executemany(
+        "INSERT OR IGNORE INTO work_types VALUES (?,?,?,?,?)", db.WORK_TYPES
+    )
+
+
+# 2: jobs.workday_id, per i database creati prima della tabella workdays -----
+
+
+def _add_workday_id(cx):
+    cx.execute(
+        "ALTER TABLE jobs ADD COLUMN workday_id INTEGER REFERENCES workdays(id)"
+    )
+
+
+def _fill_workday_id(cx, after, until):
+    cx.execute(
+        """INSERT OR IGNORE INTO workdays(day)
+           SELECT DISTINCT date(start_at) FROM jobs WHERE id > ? AND id <= ?""",
+        (after, until),
+    )
+    cx.execute(
+        """UPDATE jobs
+           SET workday_id = (SELECT w.id FROM workdays w WHERE w.day = date(jobs.start_at))
+           WHERE id > ? AND id <= ? AND workday_id IS NULL""",
+        (after, until),
+    )
+
+
+# 3: jobs.work_type (testo libero) -> jobs.work_type_id ----------------------
+
+
+def _add_work_type_id(cx):
+    # le tabelle derivate che leggono work_type si ricostruiscono al passo 4
+    for trigger in (
+        "trg_jobs_rollup_insert",
+        "trg_jobs_rollup_delete",
+        "trg_jobs_rollup_update",
+        "trg_jobs_fts_insert",
+        "trg_jobs_fts_delete",
+        "trg_jobs_fts_update",
+    ):
+        cx.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cx.execute("DROP TABLE IF EXISTS jobs_fts")
+    cx.execute("DROP TABLE IF EXISTS daily_totals")
+    cx.execute(
+        "ALTER TABLE jobs ADD COLUMN work_type_id INTEGER REFERENCES work_types(id)"
+    )
+
+
+def _fill_work_type_id(cx, after, until):
+    # i codici fuori tassonomia restano, senza categoria
+    cx.execute(
+        """INSERT OR IGNORE INTO work_types(code, label, category, billable)
+           SELECT DISTINCT work_type, work_type, 'none', 0 FROM jobs
+           WHERE id > ? AND id <= ? AND IFNULL(work_type, '') <> ''""",
+        (after, until),
+    )
+    cx.execute(
+        """UPDATE jobs
+           SET work_type_id = (SELECT w.id FROM work_types w WHERE w.code = jobs.work_type)
+           WHERE id > ? AND id <= ? AND IFNULL(work_type, '') <> ''""",
+        (after, until),
+    )
+
+
+def _drop_work_type(cx):
+    cx.execute("ALTER TABLE jobs DROP COLUMN work_type")
+    db.on_commit(lookup_cache.WORK_TYPES.clear)
+
+
+# 4: tabelle derivate ---------------------------------------------------------
+
+
+def _derived_tables(cx):
+    has_rollup = db._has_table(cx, "daily_totals")
+    has_intervals = db._has_table(cx, "jobs_intervals")
+    has_search = db._has_table(cx, "jobs_fts")
+    cx.executescript(db.ROLLUP_SQL)
+    cx.executescript(db.INTERVALS_SQL)
+    cx.executescript(db.SEARCH_SQL)
+    # database esistente: i job già presenti vanno riportati nelle tabelle derivate
+    if not has_rollup:
+        db.rebuild_rollup()
+    if not has_intervals:
+        db.rebuild_intervals()
+    if not has_search:
+        db.rebuild_search()
+
+
+MIGRATIONS = [
+    Migration(1, "schema di base e tassonomia work_types", run=_base_schema),
+    Migration(
+        2,
+        "jobs.workday_id dalle date dei job",
+        needed=lambda cx: not db._has_column(cx, "jobs", "workday_id"),
+        prepare=_add_workday_id,
+        batch=_fill_workday_id,
+    ),
+    Migration(
+        3,
+        "jobs.work_type in chiave esterna su work_types",
+        needed=lambda cx: db._has_column(cx, "jobs", "work_type"),
+        prepare=_add_work_type_id,
+        batch=_fill_work_type_id,
+        finish=_drop_work_type,
+    ),
+    Migration(
+        4, "totali giornalieri, indice a intervalli e full-text", run=_derived_tables
+    ),
+    Migration(
+        5,
+        "indici per nome e per intervallo di date",
+        run=lambda cx: db.migrate_indexes(),
+    ),
+]
+
+LATEST = MIGRATIONS[-1].version
+
+
+def current_version(cx=None) -> int:
+    cx = cx or db.connect()
+    return cx.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _set_version(cx, version: int) -> None:
+    # PRAGMA non accetta parametri; version è sempre un intero di MIGRATIONS
+    cx.execute(f"PRAGMA user_version = {int(version)}")
+
+
+def _progress_row(cx, version: int):
+    return cx.execute(
+        "SELECT last_id, max_id, finished_at FROM schema_migrations WHERE version = ?",
+        (version,),
+    ).fetchone()
+
+
+def _run_batched(m: Migration, batch_size: int, pause: float, progress) -> None:
+    with db.transaction() as cx:
+        row = _progress_row(cx, m.version)
+        if row is None:
+            m.prepare(cx)
+            max_id = cx.execute("SELECT IFNULL(MAX(id), 0) FROM jobs").fetchone()[0]
+            cx.execute(
+                "INSERT INTO schema_migrations(version, max_id) VALUES (?, ?)",
+                (m.version, max_id),
+            )
+            last_id = 0
+        else:
+            last_id, max_id = row["last_id"], row["max_id"]
+    # i job inseriti dopo l'avvio li scrive già il codice nuovo
+    while last_id < max_id:
+        until = min(last_id + batch_size, max_id)
+        with db.transaction() as cx:
+            m.batch(cx, last_id, until)
+            cx.execute(
+                "UPDATE schema_migrations SET last_id = ? WHERE version = ?",
+                (until, m.version),
+            )
+        last_id = until
+        if progress:
+            progress(m, last_id, max_id)
+        if pause and last_id < max_id:
+            time.sleep(pause)  # spazio per gli altri processi che scrivono
+    with db.transaction() as cx:
+        if m.finish:
+            m.finish(cx)
+        cx.execute(
+            "UPDATE schema_migrations SET finished_at = CURRENT_TIMESTAMP "
+            "WHERE version = ?",
+            (m.version,),
+        )
+        _set_version(cx, m.version)
+
+
+def migrate(
+    target: int | None = None,
+    batch_size: int = BATCH_SIZE,
+    pause: float = 0.0,
+    progress=None,
+) -> list[int]:
+    """Applica in ordine le migrazioni fino a target (default l'ultima).
+
+    progress(migrazione, id_raggiunto, id_finale) viene chiamato dopo ogni
+    blocco dei passi che spostano dati. Ritorna le versioni applicate.
+    """
+    target = LATEST if target is None else target
+    cx = db.connect()
+    cx.execute(PROGRESS_SQL)
+    applied = []
+    for m in MIGRATIONS:
+        if m.version <= current_version(cx) or m.version > target:
+            continue
+        # una migrazione a blocchi interrotta riprende anche se needed() ora
+        # è falso: la colonna nuova esiste già
+        started = _progress_row(cx, m.version) is not None
+        if m.batch and (started or m.needed(cx)):
+            _run_batched(m, batch_size, pause, progress)
+        else:
+            if m.run and m.needed(cx):
+                m.run(cx)
+            with db.transaction() as tx:
+                _set_version(tx, m.version)
+        applied.append(m.version)
+    return applied
+
+
+def status() -> list[dict]:
+    """Stato di ogni migrazione: applicata, in corso (con i blocchi) o da fare."""
+    cx = db.connect()
+    cx.execute(PROGRESS_SQL)
+    version = current_version(cx)
+    rows = []
+    for m in MIGRATIONS:
+        row = _progress_row(cx, m.version)
+        if m.version <= version:
+            state = "applicata"
+        elif row is not None:
+            state = f"in corso (id {row['last_id']}/{row['max_id']})"
+        else:
+            state = "da applicare"
+        rows.append(
+            {"version": m.version, "description": m.description, "state": state}
+        )
+    return rows
@@ -1,57 +1,28 @@
+import csv
+import json
 from datetime import datetime
-from tabulate import tabulate
-from rich.console import Console
-from rich.table import Table
+
+
+# categoria di jobs_tag -> categorie di work_types che comprende
+TAG_CATEGORIES = {"work": ("work", "travel"), "wait": ("wait",), "out": ("out",)}
 
 
 def jobs_tag(type: str, value: str | None = None):
-    work_tag = {
-        "1": "Fitting & Setting",
-        "2": "Start Up",
-        "3": "Commissioning",
-        "4": "Warranty Work",
-        "5": "Tech Assistance",
-        "6": "Training - Demo",
-        "7": "Test",
-        "8": "Site Survey",
-        "9": "Diagnostic Visit",
-        "10": "Refurbishment",
-        "11": "Option - Upgrade",
-        "12": "Invoiced Work",
-        "13": "Day Off On Job",
-        "14": "Day Off At Home",
-        "15": "Not Chargeable",
-        "16": "Others",
-        "T": "Travel",
-    }
-
-    wait_tag = {
-        "A": "Waiting For End User",
-        "B": "Waiting For Supplier",
-        "C": "Waiting For Customer",
-    }
-
-    out_of_range_tags = {
-        "D": "Adjustaments",
-        "E": "Repair",
-        "F": "Problem Research",
-        "G": "Customer Request",
-        "H": "On Site Final Touch",
-        "I": "Work On Ancillary",
-        "J": "MIssing Parts",
-        "K": "Others",
-    }
-
-    match type:
-        case "work":
-            tag = work_tag
-        case "wait":
-            tag = wait_tag
-        case "out":
-            tag = out_of_range_tags
-        case _:
-            raise ValueError(f"Tipo non riconosciuto: {type}")
+    """Codici e descrizioni dei tipi di lavoro di una categoria (work, wait, out),
+    letti dalla tabella work_types; con value ritorna la sola descrizione."""
+    if type not in TAG_CATEGORIES:
+        raise ValueError(f"Tipo non riconosciuto: {type}")
+
+    from controller import db_connector as db
+    from controller import lookup_cache
 
+    def load():
+        categories = TAG_CATEGORIES[type]
+        return {
+            r["code"]: r["label"] for r in db.work_types() if r["category"] in categories
+        }
+
+    tag = db.lookup(lookup_cache.WORK_TYPES, type, load)
     if value is None:
         return tag
 
@@ -59,6 +30,8 @@ def jobs_tag(type: str, value: str | None = None):
 
 
 def print_table(d):
+    from tabulate import tabulate
+
     rows = [(k, v) for k, v in d.items()]
     print(tabulate(rows, headers=["Codice", "Descrizione"], tablefmt="fancy_grid"))
 
@@ -69,16 +42,25 @@ def dict_to_table(rows: list[dict] | None = None, *, title: str):
         print("Nessun cliente trovato.")
         return
 
-    # Usa le chiavi del primo dict come intestazioni
+    # rich è pesante da importare: lo carica solo chi stampa una tabella
+    from rich.console import Console
+    from rich.table import Table
+
+    # Usa le chiavi del primo dict come intestazioni; se le righe hanno un id
+    # stabile si mostra quello al posto dell'indice posizionale
     fieldnames = list(rows[0].keys())
     table = Table(title=title)
-    table.add_column("index")
+    if "id" not in fieldnames:
+        table.add_column("index")
 
     for field in fieldnames:
         table.add_column(field)
 
     for idx, row in enumerate(rows, start=1):
-        table.add_row(str(idx), *[str(row.get(field, "")) for field in fieldnames])
+        values = [str(row.get(field, "")) for field in fieldnames]
+        if "id" not in fieldnames:
+            values.insert(0, str(idx))
+        table.add_row(*values)
 
     Console().print(table)
 
@@ -97,3 +79,61 @@ def is_time_valid(v: str) -> bool:
         return True
     except ValueError:
         return False
+
+
+def iter_csv(path):
+    """Legge un CSV riga per riga come coppie (numero_riga, dict).
+
+    L'intestazione è sulla prima riga; il numero è quello della riga del file
+    (l'ultima, per un campo tra virgolette su più righe).
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def iter_ndjson(path):
+    """Legge un file NDJSON (un oggetto JSON per riga) come coppie
+    (numero_riga, oggetto), saltando le righe vuote.
+
+    Le righe non decodificabili producono None, così chi consuma può segnalarle
+    senza interrompere la lettura.
+    """
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield n, json.loads(line)
+            except json.JSONDecodeError:
+                yield n, None
+
+
+def write_csv(rows, out):
+    """Scrive righe (dict) in CSV man mano che arrivano."""
+    writer = None
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(out, fieldnames=list(row.keys()))
+            writer.writeheader()
+        writer.writerow(row)
+
+
+def write_json(rows, out):
+    """Scrive righe (dict) come array JSON senza tenerle tutte in memoria."""
+    out.write("[")
+    for i, row in enumerate(rows):
+        out.write(",\n" if i else "\n")
+        out.write(json.dumps(row, ensure_ascii=False))
+    out.write("\n]\n")
+
+
+def write_ndjson(rows, out):
+    """Scrive righe (dict) come NDJSON, un oggetto per riga."""
+    for row in rows:
+        out.write(json.dumps(row, ensure_ascii=False))
+        out.write("\n")
+
+
+WRITERS = {"csv": write_csv, "json": write_json, "ndjson": write_ndjson}
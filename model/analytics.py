@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Indicatori di utilizzo e fatturabilità (`chrono analisi`).
+
+Ogni indicatore è una sola query aggregata su daily_totals, che ha già una riga
+per giorno, progetto e codice di lavoro: le somme per categoria, per settimana
+e le medie mobili (funzioni finestra) le calcola SQLite, e in Python arrivano
+solo poche righe per settimana o per cliente, in colonne (db_connector.Columns).
+"""
+from controller import archive
+from controller import db_connector as db
+from model import reports
+
+TARGET_HOURS = 40.0  # ore fatturabili attese in una settimana
+WINDOW = 4  # settimane della media mobile
+
+TABLES = """
+    {0} t
+    JOIN projects p ON p.id = t.project_id
+    JOIN clients  c ON c.id = p.client_id
+    LEFT JOIN work_types w ON w.id = t.work_type_id
+"""
+BILLABLE = "IFNULL(w.billable, 0)"
+TRAVEL = "w.category = 'travel'"
+# lunedì della settimana e suo numero progressivo, per le finestre in settimane
+MONDAY = "date(t.day, 'weekday 0', '-6 days')"
+WEEK_NO = f"CAST(julianday({MONDAY}) AS INTEGER) / 7"
+
+
+def _seconds(condition: str) -> str:
+    """Secondi delle righe che soddisfano condition, zero se non ce ne sono."""
+    return f"IFNULL(SUM(t.seconds) FILTER (WHERE {condition}), 0)"
+
+
+def _where(start_day, end_day, client, project):
+    return reports._filters(
+        "t.day >= ?", "t.day <= ?", start_day, end_day, client, project
+    )
+
+
+def _tables(start_day, end_day):
+    # daily_totals comprende gli archivi annuali del periodo
+    return TABLES.format(archive.union("daily_totals", start_day, end_day))
+
+
+def categories(
+    start_day: str | None,
+    end_day: str | None,
+    client: str | None = None,
+    project: str | None = None,
+):
+    """Ore per categoria di jobs_tag (work, travel, wait, out, none) e quota
+    percentuale sul totale del periodo."""
+    where, params = _where(start_day, end_day, client, project)
+    sql = f"""
+        SELECT {reports.CATEGORY} AS category,
+               SUM(t.jobs) AS jobs,
+               ROUND(SUM(t.seconds) / 3600.0, 2) AS hours,
+               ROUND(100.0 * SUM(t.seconds) / SUM(SUM(t.seconds)) OVER (), 1)
+                   AS share
+        FROM {_tables(start_day, end_day)}
+        WHERE {where}
+        GROUP BY category
+        ORDER BY hours DESC
+    """
+    return db.get_columns(sql, params)
+
+
+def billing(
+    start_day: str | None,
+    end_day: str | None,
+    client: str | None = None,
+    project: str | None = None,
+) -> dict:
+    """Totali del periodo: ore fatturabili e non, quota di viaggio (in %)."""
+    where, params = _where(start_day, end_day, client, project)
+    sql = f"""
+        SELECT ROUND(IFNULL(SUM(t.seconds), 0) / 3600.0, 2) AS hours,
+               ROUND({_seconds(BILLABLE)} / 3600.0, 2) AS billable,
+               ROUND({_seconds("NOT " + BILLABLE)} / 3600.0, 2) AS non_billable,
+               ROUND(IFNULL(100.0 * {_seconds(TRAVEL)}
+                            / SUM(t.seconds), 0), 1) AS travel_share
+        FROM {_tables(start_day, end_day)}
+        WHERE {where}
+    """
+    return db.get_one(sql, params)
+
+
+def weekly(
+    start_day: str | None,
+    end_day: str | None,
+    target: float = TARGET_HOURS,
+    client: str | None = None,
+    project: str | None = None,
+):
+    """Per settimana ISO: ore totali, fatturabili, di viaggio e utilizzo, cioè
+    ore fatturabili in percentuale di target."""
+    _, week = reports._group("week", "t.day")
+    where, params = _where(start_day, end_day, client, project)
+    sql = f"""
+        SELECT {week} AS week,
+               ROUND(SUM(t.seconds) / 3600.0, 2) AS hours,
+               ROUND({_seconds(BILLABLE)} / 3600.0, 2) AS billable,
+               ROUND({_seconds(TRAVEL)} / 3600.0, 2) AS travel,
+               ROUND({_seconds(BILLABLE)} / 36.0 / ?, 1) AS utilisation
+        FROM {_tables(start_day, end_day)}
+        WHERE {where}
+        GROUP BY {MONDAY}
+        ORDER BY {MONDAY}
+    """
+    return db.get_columns(sql, [target, *params])
+
+
+def rolling(
+    start_day: str | None,
+    end_day: str | None,
+    window: int = WINDOW,
+    client: str | None = None,
+    project: str | None = None,
+):
+    """Per cliente e settimana: ore della settimana e media mobile sulle ultime
+    window settimane di calendario (le settimane senza job contano zero)."""
+    if window < 1:
+        raise ValueError("La finestra deve essere di almeno una settimana")
+    _, week = reports._group("week", "t.day")
+    where, params = _where(start_day, end_day, client, project)
+    sql = f"""
+        SELECT client, week, ROUND(hours, 2) AS hours,
+               ROUND(SUM(hours) OVER (
+                   PARTITION BY client_id ORDER BY week_no
+                   RANGE BETWEEN ? PRECEDING AND CURRENT ROW
+               ) / ?, 2) AS rolling
+        FROM (
+            SELECT c.id AS client_id, c.name AS client, {week} AS week,
+                   {WEEK_NO} AS week_no, SUM(t.seconds) / 3600.0 AS hours
+            FROM {_tables(start_day, end_day)}
+            WHERE {where}
+            GROUP BY c.id, {MONDAY}
+        )
+        ORDER BY client COLLATE NOCASE, client_id, week_no
+    """
+    return db.get_columns(sql, [window - 1, window, *params])
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Report in blocco, un file per cliente e per mese, su più processi.
+
+I processi leggono tutti la stessa copia del database, fatta con
+db_connector.backup all'inizio del batch: i file prodotti sono coerenti tra
+loro anche se nel frattempo qualcuno continua a registrare job.
+"""
+import os
+import re
+import sqlite3
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+from pathlib import Path
+
+from controller import archive
+from controller import db_connector as db
+from controller import utility as util
+from model import reports
+
+# (cliente, mese) con almeno un job nel periodo, con i totali per il riepilogo
+TASKS_SQL = """
+    SELECT c.id AS client_id, c.name AS client, c.city AS city,
+           strftime('%Y-%m', t.day) AS month,
+           SUM(t.jobs) AS jobs, ROUND(SUM(t.seconds) / 3600.0, 2) AS hours
+    FROM {0} t
+    JOIN projects p ON p.id = t.project_id
+    JOIN clients  c ON c.id = p.client_id
+    WHERE t.day >= ? AND t.day <= ?
+    GROUP BY c.id, month
+    ORDER BY month, c.name COLLATE NOCASE
+"""
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^\w-]+", "_", text).strip("_") or "cliente"
+
+
+def _month_bounds(month: str, start_day: str, end_day: str) -> tuple[str, str]:
+    first = date.fromisoformat(f"{month}-01")
+    last = (first + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return max(first.isoformat(), start_day), min(last.isoformat(), end_day)
+
+
+def _init_worker(db_path: str) -> None:
+    # il processo figlio legge solo la copia del batch
+    db.DB_PATH = Path(db_path)
+
+
+def _write_report(task: dict, start_day: str, end_day: str, out_dir: str, fmt: str):
+    """Scrive il file di un (cliente, mese); gira in un processo del pool."""
+    first, last = _month_bounds(task["month"], start_day, end_day)
+    sql, params = reports.jobs_query(first, last, client_id=task["client_id"])
+    name = f"{task['client_id']}-{_slug(task['client'])}.{fmt}"
+    path = Path(out_dir) / task["month"] / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rows = 0
+
+    def counted():
+        nonlocal rows
+        for row in db.iter_all(sql, params):
+            rows += 1
+            yield row
+
+    with open(path, "w", newline="", encoding="utf-8") as out:
+        util.WRITERS[fmt](counted(), out)
+    return {**task, "rows": rows, "file": str(path)}
+
+
+def batch_reports(
+    start_day: str,
+    end_day: str,
+    out_dir,
+    fmt: str = "csv",
+    workers: int | None = None,
+    progress=None,
+) -> list[dict]:
+    """Un report dei job per ogni (cliente, mese) tra start_day e end_day inclusi.
+
+    Scrive out_dir/<mese>/<id>-<cliente>.<fmt> e il riepilogo
+    out_dir/riepilogo.csv; ritorna le righe del riepilogo. progress(fatti,
+    totale) viene chiamato a ogni file completato.
+    """
+    if fmt not in util.WRITERS:
+        raise ValueError(f"Formato non riconosciuto: {fmt}")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    done = []
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = db.backup(Path(tmp) / "batch.sqlite")
+        # anche l'elenco e i totali del riepilogo vengono dalla copia
+        cx = sqlite3.connect(snapshot)
+        cx.row_factory = sqlite3.Row
+        # gli anni archiviati si leggono dagli archivi, immutabili come la copia
+        sql = TASKS_SQL.format(archive.union("daily_totals", start_day, end_day, cx))
+        tasks = [dict(r) for r in cx.execute(sql, (start_day, end_day))]
+        cx.close()
+        if not tasks:
+            return []
+        workers = min(workers or os.cpu_count() or 1, len(tasks))
+        with ProcessPoolExecutor(
+            workers, initializer=_init_worker, initargs=(str(snapshot),)
+        ) as pool:
+            futures = [
+                pool.submit(_write_report, t, start_day, end_day, str(out_dir), fmt)
+                for t in tasks
+            ]
+            for future in as_completed(futures):
+                done.append(future.result())
+                if progress:
+                    progress(len(done), len(tasks))
+
+    done.sort(key=lambda r: (r["month"], r["client"].lower(), r["client_id"]))
+    with open(out_dir / "riepilogo.csv", "w", newline="", encoding="utf-8") as out:
+        util.write_csv(done, out)
+    return done
@@ -1,24 +1,49 @@
 #!/usr/bin/env python3
 from controller import db_connector as db
+from controller import errors as er
+from controller import lookup_cache
 from dataclasses import dataclass
 from typing import Optional
 
 
-@dataclass
-class Client:
+@dataclass(slots=True)
+class Client(db.Record):
     name: Optional[str] = None
     city: Optional[str] = None
     nation: Optional[str] = None
     notes: Optional[str] = None
+    id: Optional[int] = None
 
 
-def list_clients():
-    return [
-        r
-        for r in db.get_all(
-            "SELECT name, city, nation FROM clients ORDER BY name, city, nation"
+def list_clients(limit: int | None = None, after: int | None = None):
+    """Clienti in ordine di nome; paginazione keyset: `after` è l'id dell'ultimo
+    cliente della pagina precedente."""
+    sql = "SELECT name, city, nation, notes, id FROM clients"
+    params = []
+    if after is not None:
+        # la prima condizione fa partire la lettura dell'indice dal cursore
+        cursor = "(SELECT name FROM clients WHERE id = ?)"
+        sql += (
+            f" WHERE name COLLATE NOCASE >= {cursor}"
+            f" AND (name COLLATE NOCASE > {cursor} OR id > ?)"
         )
-    ]
+        params += [after, after, after]
+    sql += " ORDER BY name COLLATE NOCASE, id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return db.get_all(sql, params, row_type=Client)
+
+
+def get_client(client_id: int) -> Client:
+    row = db.get_one(
+        "SELECT name, city, nation, notes, id FROM clients WHERE id = ?",
+        (client_id,),
+        row_type=Client,
+    )
+    if row is None:
+        raise er.ClientNotFound(client_id)
+    return row
 
 
 def add_client(params: Client):
@@ -45,6 +70,7 @@ def update_client(new_params: Client, old_params: Client):
                 old_params.city,
             ),
         )
+        db.on_commit(lookup_cache.clients_changed)
         return
 
 
@@ -57,4 +83,5 @@ def delete_client(params: Client):
                 params.city,
             ),
         )
+        db.on_commit(lookup_cache.clients_changed)
         return
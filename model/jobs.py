@@ -1,23 +1,46 @@
 #!/usr/bin/env python3
-import sqlite3
+from controller import archive
 from controller import db_connector as db
 from controller import errors as er
-from datetime import datetime
+from controller import lookup_cache
+import heapq
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 
 
-def ensure_workday(day_str):
-    with db.connect() as cx:
-        cx.execute("INSERT OR IGNORE INTO workdays(day) VALUES (?)", (day_str,))
-        row = cx.execute("SELECT id FROM workdays WHERE day=?", (day_str,)).fetchone()
-        return row["id"]
+@dataclass(slots=True)
+class Job(db.Record):
+    id: Optional[int] = None
+    start_at: Optional[str] = None
+    end_at: Optional[str] = None
+    project: Optional[str] = None
+    client: Optional[str] = None
+    hours: Optional[float] = None
+    place: Optional[str] = None
+    work_type: Optional[str] = None
+    description: Optional[str] = None
 
 
-def get_client_and_place_by_project(project_name):
-    with db.connect() as cx:
-        cx.row_factory = sqlite3.Row
-        row = cx.execute(
+def ensure_workday(day_str, cx=None):
+    cx = cx or db.connect()
+    cx.execute("INSERT OR IGNORE INTO workdays(day) VALUES (?)", (day_str,))
+    row = cx.execute("SELECT id FROM workdays WHERE day=?", (day_str,)).fetchone()
+    return row["id"]
+
+
+def _project(project_name, cx=None):
+    """Id, cliente e luogo di default del progetto, dalla cache di lookup.
+
+    Dentro una transazione si passa la sua connessione: la ricerca vede lo
+    stesso stato del database su cui poi si scrive.
+    """
+
+    def load():
+        row = (cx or db.connect(readonly=True)).execute(
             """
-                SELECT c.name AS client, c.city AS place
+                SELECT p.id, c.name AS client, c.city AS place
                 FROM projects p
                 JOIN clients  c ON c.id = p.client_id
                 WHERE p.name = ? COLLATE NOCASE
@@ -25,10 +48,103 @@ def get_client_and_place_by_project(project_name):
             """,
             (project_name,),
         ).fetchone()
-        if row is not None:
-            return row["client"], row["place"]
-        else:
-            raise er.ProjectNotFound(project_name)
+        return dict(row) if row else None
+
+    row = db.lookup(lookup_cache.PROJECTS, project_name.lower(), load)
+    if not row:
+        raise er.ProjectNotFound(project_name)
+    return row
+
+
+def get_client_and_place_by_project(project_name):
+    row = _project(project_name)
+    return row["client"], row["place"]
+
+
+def _work_type_ids() -> dict:
+    return {r["code"]: r["id"] for r in db.work_types()}
+
+
+def _work_type_id(code, ids=None):
+    """Id di work_types per un codice di jobs_tag; None se il codice manca."""
+    if not code:
+        return None
+    ids = ids if ids is not None else _work_type_ids()
+    try:
+        return ids[str(code)]
+    except KeyError:
+        raise er.WorkTypeNotFound(code) from None
+
+
+def _interval(start_at_iso, end_at_iso):
+    """Inizio e fine come datetime e come testo ISO che SQLite sa leggere.
+
+    fromisoformat accetta anche forme compatte (es. 20250102T080000) che per
+    date() e julianday() di SQLite non sono date: i trigger di daily_totals e
+    jobs_intervals fallirebbero, quindi si salva la forma estesa.
+    """
+    start = datetime.fromisoformat(start_at_iso)
+    end = datetime.fromisoformat(end_at_iso)
+    if end <= start:
+        raise ValueError("end_at deve essere > start_at")
+    return start, end, start.isoformat(), end.isoformat()
+
+
+def _epoch(dt: datetime) -> int:
+    # stessi secondi di strftime('%s') in SQLite: orari senza fuso trattati come UTC
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def find_overlap(start_epoch, end_epoch, cx=None):
+    """Id di un job che si sovrappone all'intervallo dato, o None.
+
+    La ricerca passa dall'indice R*Tree jobs_intervals; il confronto esatto
+    sui secondi scarta i falsi positivi dovuti all'arrotondamento.
+    """
+    cx = cx or db.connect(readonly=True)
+    row = cx.execute(
+        f"""
+        SELECT j.id
+        FROM jobs_intervals r
+        JOIN jobs j ON j.id = r.id
+        WHERE r.start_epoch < :end AND r.end_epoch > :start
+          AND {db.EPOCH.format("j.start_at")} < :end
+          AND {db.EPOCH.format("j.end_at")} > :start
+        LIMIT 1
+    """,
+        {"start": start_epoch, "end": end_epoch},
+    ).fetchone()
+    return row["id"] if row else None
+
+
+def find_archived_overlap(start_at, end_at, start_epoch, end_epoch, archived=None):
+    """Id di un job archiviato che si sovrappone all'intervallo dato, o None.
+
+    Gli archivi non hanno l'indice R*Tree: si cerca su idx_jobs_range tra i job
+    iniziati prima della fine, negli archivi dall'anno del giorno prima
+    dell'inizio a quello della fine. archived (anni archiviati) evita di
+    rileggere la cartella degli archivi a ogni riga di un import.
+    """
+    first = (datetime.fromisoformat(start_at) - timedelta(days=1)).date().isoformat()
+    last = end_at[:10]
+    archived = archive.archived_years() if archived is None else archived
+    if not any(int(first[:4]) <= y <= int(last[:4]) for y in archived):
+        return None
+    cx = db.connect(readonly=True)
+    row = cx.execute(
+        f"""
+        SELECT j.id
+        FROM {archive.union("jobs", first, last, cx)} j
+        WHERE j.start_at < date(:last, '+1 day') AND j.end_at > :first
+          AND {db.EPOCH.format("j.start_at")} < :end
+          AND {db.EPOCH.format("j.end_at")} > :start
+        LIMIT 1
+    """,
+        {"first": first, "last": last, "start": start_epoch, "end": end_epoch},
+    ).fetchone()
+    return row["id"] if row else None
 
 
 def add_job(
@@ -39,27 +155,39 @@ def add_job(
     place=None,
     work_type=None,
     description=None,
+    project_id=None,
+    allow_overlap=False,
 ):
-    with db.connect() as cx:
-        # Trova project_id
-        p = cx.execute(
-            "SELECT id FROM projects WHERE name=? COLLATE NOCASE", (project_name,)
-        ).fetchone()
-        if not p:
-            #            raise ValueError(f"Progetto '{project_name}' non trovato")
-            raise er.ProjectNotFound(project_name)
-        project_id = p["id"]
-        workday_id = ensure_workday(day_str)
+    """Inserisce un job in un'unica transazione e ne ritorna l'id.
 
-        # Validazione semplice orari
-        if datetime.fromisoformat(end_at_iso) <= datetime.fromisoformat(start_at_iso):
-            raise ValueError("end_at deve essere > start_at")
+    Se project_id è già noto la ricerca del progetto viene saltata; altrimenti
+    il luogo di default è la città del cliente del progetto. Un job che si
+    sovrappone a uno esistente, anche archiviato, solleva JobOverlap, salvo
+    allow_overlap.
+    """
+    # Validazione semplice orari
+    start, end, start_at_iso, end_at_iso = _interval(start_at_iso, end_at_iso)
+    work_type_id = _work_type_id(work_type)
 
-        client, place = get_client_and_place_by_project(project_name)
+    with db.transaction() as cx:
+        if not allow_overlap:
+            other = find_overlap(_epoch(start), _epoch(end), cx)
+            if other is None:
+                other = find_archived_overlap(
+                    start_at_iso, end_at_iso, _epoch(start), _epoch(end)
+                )
+            if other is not None:
+                raise er.JobOverlap(start_at_iso, end_at_iso, other)
 
-        cx.execute(
+        if project_id is None:
+            p = _project(project_name, cx)
+            project_id = p["id"]
+            place = place or p["place"]
+
+        workday_id = ensure_workday(day_str, cx)
+        cur = cx.execute(
             """
-            INSERT INTO jobs(workday_id, project_id, start_at, end_at, place, work_type, description)
+            INSERT INTO jobs(workday_id, project_id, start_at, end_at, place, work_type_id, description)
             VALUES (?,?,?,?,?,?,?)
         """,
             (
@@ -68,31 +196,310 @@ def add_job(
                 start_at_iso,
                 end_at_iso,
                 place,
-                work_type,
+                work_type_id,
                 description,
             ),
         )
+        return cur.lastrowid
 
 
 def job_report(day_str):
     """Ritorna elenco lavori e ore totali in quella giornata."""
-    with db.connect() as cx:
-        rows = cx.execute(
-            """
-            SELECT j.id, p.name AS project, j.start_at, j.end_at, j.place, j.work_type, j.description
-            FROM jobs j
-            JOIN workdays w ON w.id = j.workday_id
-            JOIN projects p ON p.id = j.project_id
-            WHERE w.day = ?
-            ORDER BY j.start_at
-        """,
-            (day_str,),
-        ).fetchall()
+    rows = db.get_all(
+        """
+        SELECT j.id, p.name AS project, j.start_at, j.end_at, j.place, wt.code AS work_type,
+               j.description,
+               ROUND((julianday(j.end_at) - julianday(j.start_at)) * 24, 2) AS hours
+        FROM jobs j
+        JOIN workdays w ON w.id = j.workday_id
+        JOIN projects p ON p.id = j.project_id
+        LEFT JOIN work_types wt ON wt.id = j.work_type_id
+        WHERE w.day = ?
+        ORDER BY j.start_at
+    """,
+        (day_str,),
+        row_type=Job,
+    )
+
+    # Ore per riga calcolate da SQLite
+    total = round(sum(r["hours"] for r in rows), 2)
+    return rows, total
+
+
+def list_jobs(limit: int | None = None, after: int | None = None):
+    """Job dal più recente, archiviati compresi; paginazione keyset: `after` è
+    l'id dell'ultimo job visto."""
+    jobs = archive.union("jobs", None, None)
+    sql = f"""
+        SELECT j.id, j.start_at, j.end_at, p.name AS project, c.name AS client,
+               ROUND({db.JOB_SECONDS.format("j")} / 3600.0, 2) AS hours,
+               j.place, w.code AS work_type, j.description
+        FROM {jobs} j
+        JOIN projects p ON p.id = j.project_id
+        JOIN clients  c ON c.id = p.client_id
+        LEFT JOIN work_types w ON w.id = j.work_type_id
+    """
+    params = []
+    if after is not None:
+        # la prima condizione fa partire la lettura dell'indice dal cursore
+        cursor = f"(SELECT start_at FROM {jobs} WHERE id = ?)"
+        sql += (
+            f" WHERE j.start_at <= {cursor}"
+            f" AND (j.start_at < {cursor} OR j.id < ?)"
+        )
+        params += [after, after, after]
+    sql += " ORDER BY j.start_at DESC, j.id DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return db.get_all(sql, params, row_type=Job)
+
+
+def _match(text: str) -> str:
+    # ogni parola diventa un prefisso tra virgolette: l'input dell'utente non
+    # viene interpretato come sintassi FTS5 (AND, NEAR, -, ...)
+    terms = ('"' + t.replace('"', '""') + '"*' for t in text.split())
+    return " ".join(terms)
+
+
+def search_jobs(
+    text: str,
+    client: str | None = None,
+    project: str | None = None,
+    start_day: str | None = None,
+    end_day: str | None = None,
+    limit: int = 50,
+):
+    """Job che contengono tutte le parole di text, dal più pertinente.
+
+    Cerca in descrizione, luogo e tipo di lavoro attraverso l'indice jobs_fts
+    del database principale e di ogni archivio del periodo, e fonde i
+    risultati per pertinenza; snippet evidenzia le parole trovate con il
+    markup di rich.
+    """
+    from model import reports
+
+    _, _, lower, upper, _, _ = reports.SOURCES["jobs"]
+    where, params = reports._filters(lower, upper, start_day, end_day, client, project)
+    sql = """
+        SELECT j.id, j.start_at, j.end_at, c.name AS client, p.name AS project,
+               w.code AS work_type,
+               snippet(jobs_fts, -1, '[b]', '[/b]', '…', 12) AS snippet,
+               ROUND(bm25(jobs_fts), 3) AS rank
+        FROM {schema}.jobs_fts
+        JOIN {schema}.jobs j ON j.id = jobs_fts.rowid
+        JOIN projects p ON p.id = j.project_id
+        JOIN clients  c ON c.id = p.client_id
+        LEFT JOIN work_types w ON w.id = j.work_type_id
+        WHERE jobs_fts MATCH ? AND {where}
+        ORDER BY rank
+        LIMIT ?
+    """
+    match = _match(text)
+    if not match:
+        return []
+    args = [match, *params, limit]
+    rows = db.get_all(sql.format(schema="main", where=where), args)
+    # la copia archiviata di un job ancora nel database principale non conta
+    where += " AND NOT EXISTS (SELECT 1 FROM main.jobs m WHERE m.id = j.id)"
+    cx = db.connect(readonly=True)
+    for years in archive.attached_groups(cx, archive.years_between(start_day, end_day)):
+        for y in years:
+            rows += db.get_all(sql.format(schema=f"archive_{y}", where=where), args)
+    return sorted(rows, key=lambda r: r["rank"])[:limit]
+
+
+def _project_map(cx):
+    # NOCASE come nelle ricerche per nome
+    return {
+        r["name"].lower(): r["id"]
+        for r in cx.execute("SELECT id, name FROM projects").fetchall()
+    }
+
+
+def _workday_ids(cx, days, cache):
+    missing = [d for d in days if d not in cache]
+    if missing:
+        cx.executemany(
+            "INSERT OR IGNORE INTO workdays(day) VALUES (?)", ((d,) for d in missing)
+        )
+        for d in missing:
+            cache[d] = cx.execute(
+                "SELECT id FROM workdays WHERE day=?", (d,)
+            ).fetchone()["id"]
+    return cache
+
+
+def _overlapping_rows(cx, batch):
+    """Numeri di riga del blocco che si sovrappongono al DB, agli archivi o a
+    righe precedenti."""
+    rejected = set()
+    max_end = None
+    archived = archive.archived_years()
+    # sweep sul blocco ordinato per inizio, più una ricerca R*Tree per riga
+    for n, start, end, _, _, start_at, end_at, *_ in sorted(
+        batch, key=lambda b: (b[1], b[0])
+    ):
+        if (
+            (max_end is not None and start < max_end)
+            or find_overlap(start, end, cx)
+            or find_archived_overlap(start_at, end_at, start, end, archived)
+        ):
+            rejected.add(n)
+            continue
+        max_end = end if max_end is None else max(max_end, end)
+    return rejected
+
+
+INSERT_JOB_SQL = """
+INSERT INTO jobs(workday_id, project_id, start_at, end_at, place, work_type_id, description)
+VALUES (?,?,?,?,?,?,?)
+"""
+
+
+def _insert_rows(cx, batch, workdays, errors) -> int:
+    """Inserisce le righe del blocco e ritorna quante ne sono entrate.
+
+    Se il blocco fallisce (es. un trigger rifiuta una riga) lo si riprova una
+    riga alla volta, ognuna nel suo SAVEPOINT: si scartano solo quelle che
+    falliscono, con il loro errore.
+    """
+    values = [(workdays[b[3]], *b[4:]) for b in batch]
+    try:
+        with db.transaction():
+            cx.executemany(INSERT_JOB_SQL, values)
+        return len(values)
+    except sqlite3.Error:
+        pass
+    inserted = 0
+    for b, value in zip(batch, values):
+        try:
+            with db.transaction():
+                cx.execute(INSERT_JOB_SQL, value)
+            inserted += 1
+        except sqlite3.Error as e:
+            errors.append((b[0], str(e)))
+    return inserted
+
+
+def add_jobs(
+    rows, batch_size=5000, allow_overlap=False, numbered=False, deferred=False
+):
+    """Inserisce in blocco i job di un iterabile di dict.
+
+    Ogni riga ha project, start_at, end_at e opzionalmente day, place,
+    work_type, description. Le righe non valide (comprese quelle che si
+    sovrappongono ad altri job, salvo allow_overlap) non interrompono l'import:
+    ritorna (inseriti, errori) con errori = [(numero_riga, messaggio), ...].
+    Con numbered le righe sono coppie (numero_riga, dict), come quelle di
+    utility.iter_csv e utility.iter_ndjson; altrimenti si contano da 1.
+
+    Di default ogni blocco di batch_size righe ha la sua transazione e i
+    trigger aggiornano le tabelle derivate job per job. Con deferred tutto
+    l'import è un'unica transazione che sospende i trigger di inserimento e
+    aggiorna totali, indice a intervalli e full-text con una query per blocco
+    o alla fine (db_connector.deferred_insert_triggers): per i caricamenti
+    grandi, durante i quali gli altri processi non possono scrivere.
+    """
+    if not deferred:
+        return _add_jobs(rows, batch_size, allow_overlap, numbered)
+    with db.transaction() as cx:
+        with db.deferred_insert_triggers(cx, intervals=allow_overlap) as last_id:
+            indexed = last_id
+
+            def index_intervals():
+                # il controllo delle sovrapposizioni del blocco dopo vede questo
+                nonlocal indexed
+                cx.execute(db.APPEND_INTERVALS_SQL, (indexed,))
+                last = cx.execute("SELECT IFNULL(MAX(id), 0) FROM jobs")
+                indexed = last.fetchone()[0]
+
+            after_flush = None if allow_overlap else index_intervals
+            return _add_jobs(rows, batch_size, allow_overlap, numbered, after_flush)
+
+
+def _add_jobs(rows, batch_size, allow_overlap, numbered, after_flush=None):
+    projects = _project_map(db.connect())
+    work_types = _work_type_ids()
+    workdays = {}
+    errors = []
+    inserted = 0
+    batch = []
+
+    def flush():
+        nonlocal inserted
+        with db.transaction() as cx:
+            if not allow_overlap:
+                rejected = _overlapping_rows(cx, batch)
+                errors.extend((n, "si sovrappone a un altro job") for n in rejected)
+                batch[:] = [b for b in batch if b[0] not in rejected]
+            _workday_ids(cx, {b[3] for b in batch}, workdays)
+            inserted += _insert_rows(cx, batch, workdays, errors)
+            if after_flush:
+                after_flush()
+        batch.clear()
+
+    for n, row in rows if numbered else enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append((n, "riga non valida"))
+            continue
+        try:
+            name = row.get("project") or ""
+            if not isinstance(name, str):
+                raise ValueError("project deve essere il nome di un progetto")
+            project_id = projects.get(name.lower())
+            if project_id is None:
+                raise er.ProjectNotFound(name)
+            start, end, start_at, end_at = _interval(row["start_at"], row["end_at"])
+            work_type_id = _work_type_id(row.get("work_type"), work_types)
+        except KeyError as e:
+            errors.append((n, f"campo mancante: {e}"))
+            continue
+        except (er.AppError, TypeError, ValueError) as e:
+            errors.append((n, str(e)))
+            continue
+
+        batch.append(
+            (
+                n,
+                _epoch(start),
+                _epoch(end),
+                row.get("day") or start_at[:10],
+                project_id,
+                start_at,
+                end_at,
+                row.get("place") or None,
+                work_type_id,
+                row.get("description") or None,
+            )
+        )
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+    errors.sort()
+    return inserted, errors
+
 
-        # Calcolo ore totali in Python (portabile tra DB)
-        def hours(a, b):
-            dt = datetime.fromisoformat(b) - datetime.fromisoformat(a)
-            return round(dt.total_seconds() / 3600, 2)
+def all_overlaps():
+    """Tutte le coppie di job sovrapposti, archiviati compresi, in un unico
+    passaggio sweep-line.
 
-        total = sum(hours(r["start_at"], r["end_at"]) for r in rows)
-        return rows, total
+    Genera tuple (job, job_successivo) di dict con id, project, start_at, end_at.
+    """
+    sql = f"""
+        SELECT j.id, p.name AS project, j.start_at, j.end_at,
+               {db.EPOCH.format("j.start_at")} AS start_epoch,
+               {db.EPOCH.format("j.end_at")} AS end_epoch
+        FROM {archive.union("jobs", None, None)} j
+        JOIN projects p ON p.id = j.project_id
+        ORDER BY start_epoch, j.id
+    """
+    active = []  # heap (fine, id, job) dei job ancora aperti
+    for job in db.iter_all(sql):
+        while active and active[0][0] <= job["start_epoch"]:
+            heapq.heappop(active)
+        for _, _, other in active:
+            yield other, job
+        heapq.heappush(active, (job["end_epoch"], job["id"], job))
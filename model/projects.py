@@ -1,29 +1,40 @@
 #!/usr/bin/env python3
 from controller import db_connector as db
+from controller import errors as er
+from controller import lookup_cache
 from model.clients import Client
+from dataclasses import dataclass
 from typing import Optional
 
 
-class Project:
+@dataclass(slots=True)
+class Project(db.Record):
+    id: Optional[int] = None
     name: Optional[str] = None
     color: Optional[str] = None
     active: Optional[int] = None
+    client: Optional[str] = None
+
+
+def _client_id(name, city):
+    def load():
+        row = db.get_one(
+            "SELECT id FROM clients WHERE name = ? AND city = ?", (name, city)
+        )
+        return row.get("id")
+
+    client_id = db.lookup(lookup_cache.CLIENTS, (name, city), load)
+    if client_id is None:
+        raise er.ClientNotFound(name, city)
+    return client_id
 
 
 def add_project(p_params: Project, c_params: Client):
+    client_id = _client_id(c_params.name, c_params.city)
     with db.transaction() as cx:
-        sql_id = "SELECT id FROM clients WHERE name = ? AND city = ?"
         sql_add = (
             "INSERT OR IGNORE INTO projects(client_id, name, color) VALUES (?, ?, ?)"
         )
-        row = cx.execute(
-            sql_id,
-            (
-                c_params.name,
-                c_params.city,
-            ),
-        ).fetchone()
-        client_id = row[0]
         cx.execute(
             sql_add,
             (client_id, p_params.name, p_params.color),
@@ -31,43 +42,85 @@ def add_project(p_params: Project, c_params: Client):
     return
 
 
+def _project_id(params: Project) -> int:
+    # i nomi sono unici solo per cliente: si modifica sempre per id
+    if params.id is None:
+        raise er.ProjectNotFound(params.name)
+    return params.id
+
+
 def update_project_state(params: Project):
+    project_id = _project_id(params)
     with db.transaction() as cx:
         cx.execute(
-            "UPDATE projects SET active = ? WHERE name = ? COLLATE NOCASE;",
-            (params.active, params.name),
+            "UPDATE projects SET active = ? WHERE id = ?;",
+            (params.active, project_id),
         )
+        db.on_commit(lambda: lookup_cache.project_changed(params.name))
         return
 
 
 def check_project_state():
     query = "SELECT name FROM projects WHERE active=1"
-    return [dict(r) for r in db.get_all(query)]
+    return db.get_all(query)
 
 
 def change_project_name(new_params: Project, old_params: Project):
+    project_id = _project_id(old_params)
     with db.transaction() as cx:
         cx.execute(
-            """
-            UPDATE projects SET name = ? WHERE name= ? COLLATE NOCASE;
-            """,
-            (new_params.name, old_params.name),
+            "UPDATE projects SET name = ? WHERE id = ?;",
+            (new_params.name, project_id),
         )
+        db.on_commit(lambda: lookup_cache.project_changed(old_params.name))
+
+
+def _list_project(where, params, limit, after):
+    # paginazione keyset su (nome, id): `after` è l'id dell'ultimo progetto visto
+    query = (
+        "SELECT p.id, p.name, p.color, p.active, c.name AS client"
+        " FROM projects p JOIN clients c ON c.id = p.client_id"
+    )
+    conditions = list(where)
+    params = list(params)
+    if after is not None:
+        # la prima condizione fa partire la lettura dell'indice dal cursore
+        cursor = "(SELECT name FROM projects WHERE id = ?)"
+        conditions.append(
+            f"p.name COLLATE NOCASE >= {cursor}"
+            f" AND (p.name COLLATE NOCASE > {cursor} OR p.id > ?)"
+        )
+        params += [after, after, after]
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY p.name COLLATE NOCASE, p.id"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    return db.get_all(query, params, row_type=Project)
+
+
+def list_project(limit: int | None = None, after: int | None = None):
+    return _list_project([], [], limit, after)
 
 
-def list_project():
-    query = "SELECT p.name AS project, c.name AS client, active FROM projects p JOIN clients c ON c.id = p.client_id ORDER BY client, project"
-    return [dict(r) for r in db.get_all(query)]
+def list_active_project(limit: int | None = None, after: int | None = None):
+    return _list_project(["p.active = ?"], [1], limit, after)
 
 
-def list_active_project():
-    query = "SELECT p.name AS project, c.name AS client, active FROM projects p JOIN clients c ON c.id = p.client_id WHERE p.active = 1 ORDER BY client, project"
-    return [dict(r) for r in db.get_all(query)]
+def get_project(project_id: int) -> Project:
+    row = db.get_one(
+        "SELECT id, name, color, active FROM projects WHERE id = ?",
+        (project_id,),
+        row_type=Project,
+    )
+    if row is None:
+        raise er.ProjectNotFound(project_id)
+    return row
 
 
 def delete_project(params: Project):
+    project_id = _project_id(params)
     with db.transaction() as cx:
-        cx.execute(
-            "DELETE FROM projects WHERE name = ? COLLATE NOCASE",
-            (params.name,),
-        )
+        cx.execute("DELETE FROM projects WHERE id = ?", (project_id,))
+        db.on_commit(lambda: lookup_cache.project_changed(params.name))
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Verifica che le query del model usino gli indici (EXPLAIN QUERY PLAN).
+
+Esegue le funzioni del model su un database temporaneo, registra ogni
+istruzione eseguita e segnala quelle con WHERE che finiscono in uno SCAN.
+"""
+import re
+import tempfile
+from pathlib import Path
+
+from controller import archive
+from controller import db_connector as db
+from model import analytics, clients, jobs, projects, reports
+
+_CHECKED = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+
+def _exercise():
+    cl = clients.Client("Cliente", "Città", "Italia")
+    clients.add_client(cl)
+    clients.list_clients()
+    clients.list_clients(limit=10, after=1)
+    clients.get_client(1)
+
+    pr = projects.Project()
+    pr.name, pr.active = "Progetto", 1
+    projects.add_project(pr, cl)
+    projects.list_project()
+    projects.list_active_project()
+    projects.list_project(limit=10, after=1)
+    projects.list_active_project(limit=10, after=1)
+    projects.get_project(1)
+    projects.check_project_state()
+
+    db.exist("clients", "name", cl.name)
+    db.exist("clients", "city", cl.city)
+    db.exist("projects", "name", pr.name)
+    db.exist("jobs", "project_id", 1)
+
+    jobs.add_job("2025-01-02", pr.name, "2025-01-02T08:00:00", "2025-01-02T12:00:00")
+    list(jobs.all_overlaps())
+    jobs.list_jobs(limit=10)
+    jobs.list_jobs(limit=10, after=1)
+    jobs.add_jobs(
+        [
+            {
+                "project": pr.name,
+                "start_at": "2025-01-03T08:00:00",
+                "end_at": "2025-01-03T09:00:00",
+            }
+        ]
+    )
+    jobs.get_client_and_place_by_project(pr.name)
+    jobs.job_report("2025-01-02")
+    jobs.search_jobs("riunione")
+    jobs.search_jobs("riunione", cl.name, pr.name, "2025-01-01", "2025-01-31")
+    for source in reports.SOURCES:
+        for group in reports.GROUPS:
+            reports.report("2025-01-01", "2025-01-31", group, source=source)
+        reports.report(
+            "2025-01-01", "2025-01-31", client=cl.name, project=pr.name, source=source
+        )
+    list(db.iter_all(*reports.jobs_query("2025-01-01", "2025-01-31")))
+    list(db.iter_all(*reports.jobs_query(None, None, cl.name, pr.name)))
+    analytics.categories("2025-01-01", "2025-01-31")
+    analytics.billing("2025-01-01", "2025-01-31", cl.name, pr.name)
+    analytics.weekly("2025-01-01", "2025-01-31", client=cl.name)
+    analytics.rolling("2025-01-01", "2025-01-31", project=pr.name)
+
+    # periodi che comprendono anni archiviati: pochi (collegati alla query) e
+    # più di quanti SQLite ne collega a una connessione (copia temporanea)
+    for year in range(2008, 2021):
+        day = f"{year}-03-02"
+        jobs.add_job(day, pr.name, f"{day}T08:00:00", f"{day}T10:00:00")
+        archive.archive_year(year)
+    for start_day, end_day in (
+        ("2019-01-01", "2025-01-31"),
+        ("2008-01-01", "2014-12-31"),
+        ("2015-01-01", "2025-01-31"),
+        ("2008-01-01", "2025-01-31"),
+    ):
+        for source in reports.SOURCES:
+            reports.report(start_day, end_day, "month", source=source)
+        list(db.iter_all(*reports.jobs_query(start_day, end_day, cl.name)))
+        analytics.weekly(start_day, end_day, client=cl.name)
+    list(db.iter_all(*reports.jobs_query(None, None, project=pr.name)))
+    # job in ritardo in un anno archiviato: sovrapposizioni e ricerca negli archivi
+    jobs.add_job("2019-03-04", pr.name, "2019-03-04T08:00:00", "2019-03-04T09:00:00")
+    jobs.add_jobs(
+        [
+            {
+                "project": pr.name,
+                "start_at": "2019-03-05T08:00:00",
+                "end_at": "2019-03-05T09:00:00",
+            }
+        ]
+    )
+    list(jobs.all_overlaps())
+    jobs.list_jobs(limit=10, after=1)
+    jobs.search_jobs("riunione", start_day="2008-01-01", end_day="2025-01-31")
+
+    pr = projects.get_project(1)
+    pr.active = 0
+    projects.update_project_state(pr)
+    nuovo = projects.Project()
+    nuovo.name = "Progetto 2"
+    projects.change_project_name(nuovo, pr)
+    projects.delete_project(pr)
+    clients.update_client(clients.Client("Cliente 2", "Città", "Italia"), cl)
+    clients.delete_client(clients.Client("Cliente 2", "Città"))
+
+
+def find_scans() -> list[tuple[str, str]]:
+    """Ritorna le coppie (query, dettaglio) in cui una query filtrata fa uno SCAN."""
+    statements = []
+    old_path, old_archive = db.DB_PATH, archive.ARCHIVE_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        db.close_all()
+        db.DB_PATH = Path(tmp) / "query_check.sqlite"
+        archive.ARCHIVE_DIR = Path(tmp) / "archive"
+        try:
+            db.init_db()
+            for readonly in (False, True):
+                db.connect(readonly=readonly).set_trace_callback(statements.append)
+            _exercise()
+            for readonly in (False, True):
+                db.connect(readonly=readonly).set_trace_callback(None)
+
+            scans = []
+            for sql in dict.fromkeys(" ".join(s.split()) for s in statements):
+                if not sql.upper().startswith(_CHECKED) or " WHERE " not in sql.upper():
+                    continue
+                # archive_year collega il file in scrittura solo alla propria
+                # connessione: quelle query non hanno piano su questa
+                if " archive." in sql:
+                    continue
+                # gli archivi collegati ora possono non essere quelli della query
+                years = re.findall(r"\barchive_(\d{4})\.", sql)
+                archive.attach(db.connect(readonly=True), sorted({*map(int, years)}))
+                plan = db.query_plan(sql)
+                # sottoquery materializzate o in co-routine, es. gli UNION ALL
+                # con gli archivi: i rami hanno già il proprio piano
+                derived = {
+                    d.split()[1]
+                    for d in plan
+                    if d.startswith(("MATERIALIZE ", "CO-ROUTINE "))
+                }
+                for detail in plan:
+                    # le tabelle virtuali (R*Tree) usano il proprio indice; le
+                    # sottoquery nel FROM si scorrono per intero per costruzione
+                    virtual = "VIRTUAL TABLE INDEX" in detail
+                    subquery = detail.startswith("SCAN (subquery-") or (
+                        detail.startswith("SCAN ") and detail.split()[1] in derived
+                    )
+                    if detail.startswith("SCAN ") and not (virtual or subquery):
+                        scans.append((sql, detail))
+            return scans
+        finally:
+            db.close_all()
+            db.DB_PATH, archive.ARCHIVE_DIR = old_path, old_archive
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+from controller import archive
+from controller import db_connector as db
+
+GROUPS = ("day", "week", "month", "year", "project", "client", "category")
+
+# sorgente -> (FROM, giorno, dal giorno, al giorno, secondi, numero di job);
+# {0} nel FROM è la tabella di TABLES, unita agli archivi del periodo
+SOURCES = {
+    "rollup": (
+        "{0} t JOIN projects p ON p.id = t.project_id",
+        "t.day",
+        "t.day >= ?",
+        "t.day <= ?",
+        "SUM(t.seconds)",
+        "SUM(t.jobs)",
+    ),
+    "jobs": (
+        "{0} j JOIN projects p ON p.id = j.project_id",
+        "date(j.start_at)",
+        "j.start_at >= ?",
+        "j.start_at < date(?, '+1 day')",
+        f"SUM({db.JOB_SECONDS.format('j')})",
+        "COUNT(*)",
+    ),
+}
+
+TABLES = {"rollup": "daily_totals", "jobs": "jobs"}
+
+# JOIN con work_types w per sorgente: si aggiunge solo a chi raggruppa per
+# categoria, SQLite non la toglie da sola dalle altre query
+WORK_TYPES_JOIN = {
+    "rollup": "LEFT JOIN work_types w ON w.id = t.work_type_id",
+    "jobs": "LEFT JOIN work_types w ON w.id = j.work_type_id",
+}
+# categoria di work_types; i job senza tipo di lavoro finiscono in none
+CATEGORY = "IFNULL(w.category, 'none')"
+
+
+def _group(group_by: str, day: str):
+    """Colonne selezionate ed espressione di GROUP BY per un raggruppamento."""
+    # Settimana ISO in SQLite: il giovedì della settimana decide anno e numero
+    thursday = f"date({day}, '-3 days', 'weekday 4')"
+    week = (
+        f"strftime('%Y', {thursday}) || '-W' || "
+        f"printf('%02d', (strftime('%j', {thursday}) - 1) / 7 + 1)"
+    )
+    match group_by:
+        case "day":
+            return f"{day} AS day", day
+        case "week":
+            return f"{week} AS week", week
+        case "month":
+            return f"strftime('%Y-%m', {day}) AS month", f"strftime('%Y-%m', {day})"
+        case "year":
+            return f"strftime('%Y', {day}) AS year", f"strftime('%Y', {day})"
+        case "project":
+            return "p.name AS project, c.name AS client", "p.id"
+        case "client":
+            return "c.name AS client, c.city AS city", "c.id"
+        case "category":
+            return f"{CATEGORY} AS category", CATEGORY
+        case _:
+            raise ValueError(f"Raggruppamento non ammesso: {group_by}")
+
+
+def _filters(lower, upper, start_day, end_day, client, project, client_id=None):
+    where, params = [], []
+    for cond, value in (
+        (lower, start_day),
+        (upper, end_day),
+        ("c.name = ? COLLATE NOCASE", client),
+        ("p.name = ? COLLATE NOCASE", project),
+        ("p.client_id = ?", client_id),
+    ):
+        if value:
+            where.append(cond)
+            params.append(value)
+    return " AND ".join(where) or "1", params
+
+
+def report_query(
+    start_day: str | None,
+    end_day: str | None,
+    group_by: str = "day",
+    client: str | None = None,
+    project: str | None = None,
+    source: str = "rollup",
+):
+    """SQL e parametri del report aggregato; i limiti del periodo sono opzionali."""
+    tables, day, lower, upper, seconds, count = SOURCES[source]
+    columns, group = _group(group_by, day)
+    where, params = _filters(lower, upper, start_day, end_day, client, project)
+    work_types = WORK_TYPES_JOIN[source] if group_by == "category" else ""
+    tables = tables.format(archive.union(TABLES[source], start_day, end_day))
+    sql = f"""
+        SELECT {columns},
+               {count} AS jobs,
+               {seconds} AS seconds,
+               ROUND({seconds} / 3600.0, 2) AS hours
+        FROM {tables}
+        JOIN clients  c ON c.id = p.client_id
+        {work_types}
+        WHERE {where}
+        GROUP BY {group}
+        ORDER BY 1
+    """
+    return sql, params
+
+
+def jobs_query(
+    start_day: str | None,
+    end_day: str | None,
+    client: str | None = None,
+    project: str | None = None,
+    client_id: int | None = None,
+):
+    """SQL e parametri dell'elenco dei singoli job nel periodo."""
+    _, _, lower, upper, _, _ = SOURCES["jobs"]
+    where, params = _filters(
+        lower, upper, start_day, end_day, client, project, client_id
+    )
+    sql = f"""
+        SELECT j.id, date(j.start_at) AS day, c.name AS client, p.name AS project,
+               j.start_at, j.end_at,
+               ROUND({db.JOB_SECONDS.format("j")} / 3600.0, 2) AS hours,
+               j.place, w.code AS work_type, j.description
+        FROM {archive.union("jobs", start_day, end_day)} j
+        JOIN projects p ON p.id = j.project_id
+        JOIN clients  c ON c.id = p.client_id
+        LEFT JOIN work_types w ON w.id = j.work_type_id
+        WHERE {where}
+        ORDER BY j.start_at
+    """
+    return sql, params
+
+
+def report(
+    start_day: str,
+    end_day: str,
+    group_by: str = "day",
+    client: str | None = None,
+    project: str | None = None,
+    source: str = "rollup",
+):
+    """Ore lavorate tra start_day e end_day (inclusi), aggregate da SQLite.
+
+    Di default legge i totali giornalieri (daily_totals); source="jobs"
+    ricalcola dai singoli job. Ritorna (righe, ore_totali): le righe sono un
+    db_connector.Columns con le colonne del raggruppamento più jobs, seconds e
+    hours.
+    """
+    rows = db.get_columns(
+        *report_query(start_day, end_day, group_by, client, project, source)
+    )
+    total = round(sum(rows["seconds"]) / 3600, 2)
+    return rows, total
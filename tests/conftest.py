@@ -0,0 +1,36 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# i test importano controller e model dalla radice del repository
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from controller import archive  # noqa: E402
+from controller import db_connector as db  # noqa: E402
+from controller import lookup_cache  # noqa: E402
+from model import clients, projects  # noqa: E402
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """Database vuoto con lo schema corrente, archivi compresi, in tmp_path."""
+    db.close_all()
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite")
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", tmp_path / "archive")
+    lookup_cache.clear()
+    db.init_db()
+    yield tmp_path / "test.sqlite"
+    db.close_all()
+    lookup_cache.clear()
+
+
+@pytest.fixture
+def project(database):
+    """Nome di un progetto del cliente "Cliente" di Torino."""
+    cl = clients.Client("Cliente", "Torino", "Italia")
+    clients.add_client(cl)
+    pr = projects.Project()
+    pr.name = "Progetto"
+    projects.add_project(pr, cl)
+    return pr.name
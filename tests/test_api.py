@@ -0,0 +1,92 @@
+"""API HTTP: ETag, 304 e cache delle risposte (`chrono api`)."""
+import asyncio
+from datetime import date
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from aiohttp.test_utils import TestClient, TestServer  # noqa: E402
+
+import api  # noqa: E402
+from model import clients  # noqa: E402
+
+
+def _serve(scenario):
+    """Esegue scenario(client, app) su un server di prova."""
+
+    async def main():
+        app = api.create_app(threads=2)
+        async with TestClient(TestServer(app)) as client:
+            return await scenario(client, app)
+
+    return asyncio.run(main())
+
+
+def test_etag_and_not_modified(project):
+    async def scenario(client, app):
+        first = await client.get("/api/clients")
+        assert first.status == 200
+        etag = first.headers["ETag"]
+        assert [c["name"] for c in await first.json()] == ["Cliente"]
+
+        again = await client.get("/api/clients", headers={"If-None-Match": etag})
+        assert again.status == 304
+        assert again.headers["ETag"] == etag
+
+        # un commit cambia la generazione: la risposta in cache non vale più
+        other = clients.Client("Altro", "Milano", "Italia")
+        await app["db"].write(clients.add_client, other)
+        changed = await client.get("/api/clients", headers={"If-None-Match": etag})
+        assert changed.status == 200
+        assert changed.headers["ETag"] != etag
+        assert len(await changed.json()) == 2
+
+        stats = await (await client.get("/api/stats")).json()
+        assert stats["cache"]["misses"] == 2
+        assert stats["db"]["commits"] >= 1
+
+    _serve(scenario)
+
+
+def test_same_url_is_cached(project):
+    async def scenario(client, app):
+        bodies = [await (await client.get("/api/projects")).read() for _ in range(3)]
+        assert len(set(bodies)) == 1
+        stats = await (await client.get("/api/stats")).json()
+        assert stats["cache"] == {"size": 1, "hits": 2, "misses": 1}
+
+    _serve(scenario)
+
+
+def test_report_etag_follows_default_dates(project, monkeypatch):
+    today = date(2025, 1, 2)
+
+    class FakeDate(date):
+        @classmethod
+        def today(cls):
+            return today
+
+    monkeypatch.setattr(api, "date", FakeDate)
+
+    async def scenario(client, app):
+        nonlocal today
+        before = await client.get("/api/reports")
+        today = date(2025, 1, 3)  # mezzanotte, nessun commit
+        after = await client.get(
+            "/api/reports", headers={"If-None-Match": before.headers["ETag"]}
+        )
+        assert after.status == 200
+        assert after.headers["ETag"] != before.headers["ETag"]
+        explicit = await client.get("/api/reports?from=2025-01-03&to=2025-01-03")
+        assert explicit.headers["ETag"] == after.headers["ETag"]
+
+    _serve(scenario)
+
+
+def test_bad_parameters(database):
+    async def scenario(client, app):
+        for url in ("/api/jobs?limit=0", "/api/reports?group=x", "/api/jobs/search"):
+            assert (await client.get(url)).status == 400
+
+    _serve(scenario)
@@ -0,0 +1,125 @@
+"""Archivi annuali (controller.archive): i job archiviati restano visibili."""
+import sqlite3
+
+import pytest
+
+from controller import archive
+from controller import errors as er
+from model import jobs, reports
+
+
+def _add(project, day, start="08:00", end="09:00", **extra):
+    return jobs.add_job(day, project, f"{day}T{start}:00", f"{day}T{end}:00", **extra)
+
+
+@pytest.fixture
+def archived(project):
+    """Id di un job del 2023, archiviato."""
+    job_id = _add(project, "2023-05-02", description="collaudo quadro")
+    _add(project, "2025-01-02", description="collaudo impianto")
+    assert archive.archive_year(2023) == 1
+    return job_id
+
+
+def test_add_job_rejects_overlap_with_archived_job(project, archived):
+    with pytest.raises(er.JobOverlap) as e:
+        _add(project, "2023-05-02", "08:30", "09:30")
+    assert e.value.other_id == archived
+    # contiguo: non si sovrappone
+    _add(project, "2023-05-02", "09:00", "10:00")
+
+
+def test_add_jobs_rejects_overlap_with_archived_job(project, archived):
+    rows = [
+        {
+            "project": project,
+            "start_at": f"2023-05-02T{start}:00",
+            "end_at": f"2023-05-02T{end}:00",
+        }
+        for start, end in (("07:30", "08:30"), ("10:00", "11:00"))
+    ]
+    inserted, errors = jobs.add_jobs(rows)
+    assert inserted == 1
+    assert [n for n, _ in errors] == [1]
+
+
+def test_all_overlaps_sees_archived_jobs(project, archived):
+    late = jobs.add_job(
+        "2023-05-02",
+        project,
+        "2023-05-02T08:30:00",
+        "2023-05-02T09:30:00",
+        allow_overlap=True,
+    )
+    pairs = [(a["id"], b["id"]) for a, b in jobs.all_overlaps()]
+    assert pairs == [(archived, late)]
+
+
+def test_list_and_search_include_archived_jobs(project, archived):
+    ids = [j.id for j in jobs.list_jobs()]
+    assert ids[-1] == archived
+    assert [j.id for j in jobs.list_jobs(limit=10, after=ids[0])] == [archived]
+
+    found = jobs.search_jobs("collaudo")
+    assert sorted(r["id"] for r in found) == sorted(ids)
+    found = jobs.search_jobs("quadro", start_day="2023-01-01", end_day="2023-12-31")
+    assert [r["id"] for r in found] == [archived]
+
+
+def _reports(start_day="2000-01-01", end_day="2025-12-31"):
+    return [
+        (list(rows), total)
+        for source in reports.SOURCES
+        for group in ("day", "month", "project")
+        for rows, total in [reports.report(start_day, end_day, group, source=source)]
+    ]
+
+
+def _archived_ids(year):
+    cx = sqlite3.connect(archive.path_for(year))
+    try:
+        return [r[0] for r in cx.execute("SELECT id FROM jobs ORDER BY id")]
+    finally:
+        cx.close()
+
+
+def test_late_job_is_added_to_the_archive(project, archived):
+    late = _add(project, "2023-05-03", description="collaudo tardivo")
+    before = _reports()
+    assert archive.archive_year(2023) == 1
+    assert _archived_ids(2023) == [archived, late]
+    assert archive.live_years(2023) == []
+    assert _reports() == before
+    assert [r["id"] for r in jobs.search_jobs("tardivo")] == [late]
+
+
+def test_interrupted_archive_resumes_from_part_file(project, monkeypatch):
+    ids = [_add(project, f"2023-05-{day:02d}") for day in (2, 3)]
+    before = _reports()
+    rollup = archive.ROLLUP_SQL
+    monkeypatch.setattr(archive, "ROLLUP_SQL", "garbage {0}")
+    with pytest.raises(sqlite3.OperationalError):
+        archive.archive_year(2023)
+    assert archive.path_for(2023).with_suffix(".part").exists()
+    assert not archive.path_for(2023).exists()
+
+    monkeypatch.setattr(archive, "ROLLUP_SQL", rollup)
+    assert archive.archive_year(2023) == 0  # già tolti dal principale al primo giro
+    assert not archive.path_for(2023).with_suffix(".part").exists()
+    assert _archived_ids(2023) == ids
+    assert _reports() == before
+
+
+# 12 anni: più archivi di quanti SQLite ne collega, passano dalla copia temporanea
+@pytest.mark.parametrize("years", [1, 12])
+def test_reports_unchanged_by_archiving(project, years):
+    for year in range(2010, 2010 + years):
+        _add(project, f"{year}-03-02", work_type="T")
+        _add(project, f"{year}-12-31", "22:00", "23:30")
+    _add(project, "2025-01-02")
+    first, last = 2010, 2010 + years - 1
+    before = [_reports(), _reports(f"{first}-03-01", f"{last}-03-31")]
+    for year in range(first, last + 1):
+        assert archive.archive_year(year) == 2
+    assert archive.archived_years() == list(range(first, last + 1))
+    assert [_reports(), _reports(f"{first}-03-01", f"{last}-03-31")] == before
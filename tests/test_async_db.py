@@ -0,0 +1,90 @@
+"""AsyncDB: una scrittura che fallisce non annulla le altre del suo gruppo."""
+import asyncio
+
+import pytest
+
+from controller import async_db
+from controller import db_connector as db
+from controller import errors as er
+from model import jobs
+
+
+def _insert(name):
+    with db.transaction() as cx:
+        cx.execute(
+            "INSERT INTO clients(name, city, nation) VALUES (?, ?, 'Italia')",
+            (name, f"Città {name}"),
+        )
+
+
+def _insert_then_fail(name):
+    _insert(name)
+    raise ValueError(name)
+
+
+async def _writes(adb, calls):
+    # accodate tutte insieme: il thread di scrittura le prende nello stesso gruppo
+    return await asyncio.gather(
+        *(adb.write(fn, name) for fn, name in calls), return_exceptions=True
+    )
+
+
+def test_failed_write_is_rolled_back_alone(database):
+    calls = [
+        (_insert, "A"),
+        (_insert_then_fail, "B"),
+        (_insert, "C"),
+        (_insert, "A"),  # città duplicata: vincolo UNIQUE
+        (_insert, "D"),
+    ]
+
+    async def main():
+        async with async_db.AsyncDB() as adb:
+            results = await _writes(adb, calls)
+            names = await adb.get_all("SELECT name FROM clients ORDER BY name")
+            return results, names, adb
+
+    results, names, adb = asyncio.run(main())
+    assert [type(r).__name__ for r in results] == [
+        "NoneType",
+        "ValueError",
+        "NoneType",
+        "IntegrityError",
+        "NoneType",
+    ]
+    assert [r["name"] for r in names] == ["A", "C", "D"]
+    assert adb.writes == len(calls)
+
+
+def test_write_returns_model_result(project):
+    async def main():
+        async with async_db.AsyncDB() as adb:
+            job_id = await adb.write(
+                jobs.add_job,
+                "2025-01-02",
+                project,
+                "2025-01-02T08:00:00",
+                "2025-01-02T09:00:00",
+            )
+            with pytest.raises(er.JobOverlap):
+                await adb.write(
+                    jobs.add_job,
+                    "2025-01-02",
+                    project,
+                    "2025-01-02T08:30:00",
+                    "2025-01-02T09:30:00",
+                )
+            return job_id, await adb.run(jobs.list_jobs)
+
+    job_id, rows = asyncio.run(main())
+    assert [r.id for r in rows] == [job_id]
+
+
+def test_closed_rejects_writes(database):
+    async def main():
+        adb = async_db.AsyncDB()
+        await adb.close()
+        with pytest.raises(RuntimeError):
+            await adb.write(_insert, "A")
+
+    asyncio.run(main())
@@ -0,0 +1,127 @@
+"""Import in blocco dei job (model.jobs.add_jobs, `chrono importa-job`)."""
+import json
+
+import pytest
+
+from controller import db_connector as db
+from controller import utility as util
+from model import jobs
+
+
+def _row(project, day, start="08:00", end="09:00", **extra):
+    return {
+        "project": project,
+        "start_at": f"{day}T{start}:00",
+        "end_at": f"{day}T{end}:00",
+        **extra,
+    }
+
+
+def _derived():
+    """Tabelle derivate come le lasciano i trigger."""
+    cx = db.connect()
+    return (
+        cx.execute("SELECT * FROM daily_totals ORDER BY 1, 2, 3").fetchall(),
+        cx.execute("SELECT * FROM jobs_intervals ORDER BY id").fetchall(),
+        cx.execute(
+            "SELECT rowid FROM jobs_fts WHERE jobs_fts MATCH 'intervento' ORDER BY 1"
+        ).fetchall(),
+    )
+
+
+def test_bad_rows_are_reported_and_skipped(project):
+    rows = [
+        _row(project, "2025-01-02"),
+        _row(5, "2025-01-03"),
+        {**_row(project, "2025-01-04"), "start_at": "20250104T080000"},
+        _row(project, "2025-01-05", "10:00", "09:00"),
+        _row("Sconosciuto", "2025-01-06"),
+        {"project": project, "start_at": "2025-01-07T08:00:00"},
+        _row(project, "2025-01-02", "08:30", "09:30"),
+        "non un oggetto",
+    ]
+    inserted, errors = jobs.add_jobs(rows, batch_size=3)
+    assert inserted == 2
+    assert [n for n, _ in errors] == [2, 4, 5, 6, 7, 8]
+    # la forma compatta accettata da fromisoformat si salva in forma estesa
+    day = db.get_one("SELECT start_at FROM jobs WHERE start_at LIKE '2025-01-04%'")
+    assert day == {"start_at": "2025-01-04T08:00:00"}
+
+
+def test_row_rejected_by_sqlite_does_not_drop_its_batch(project):
+    db.connect().execute(
+        "CREATE TEMP TRIGGER reject BEFORE INSERT ON jobs "
+        "WHEN NEW.description = 'no' BEGIN SELECT RAISE(ABORT, 'rifiutata'); END"
+    )
+    rows = [
+        _row(project, f"2025-02-0{d}", description="no" if d == 2 else "ok")
+        for d in range(1, 5)
+    ]
+    assert jobs.add_jobs(rows, batch_size=10) == (3, [(2, "rifiutata")])
+
+
+def test_reported_numbers_are_file_lines(project, tmp_path):
+    ndjson = tmp_path / "jobs.ndjson"
+    ndjson.write_text(
+        "\n".join(
+            [
+                json.dumps(_row(project, "2025-03-01")),
+                "",
+                "{non json",
+                "",
+                json.dumps(_row(project, "2025-03-01", "08:30", "09:30")),
+            ]
+        ),
+        encoding="utf-8",
+    )
+    csv_file = tmp_path / "jobs.csv"
+    csv_file.write_text(
+        "project,start_at,end_at\n"
+        f"{project},2025-03-02T08:00:00,2025-03-02T09:00:00\n"
+        f"{project},2025-03-02T10:00:00,2025-03-02T09:00:00\n",
+        encoding="utf-8",
+    )
+    _, errors = jobs.add_jobs(util.iter_ndjson(ndjson), numbered=True)
+    assert [n for n, _ in errors] == [3, 5]
+    _, errors = jobs.add_jobs(util.iter_csv(csv_file), numbered=True)
+    assert [n for n, _ in errors] == [3]
+
+
+@pytest.mark.parametrize("allow_overlap", [False, True])
+def test_deferred_matches_triggers(project, allow_overlap):
+    rows = [
+        _row(
+            project,
+            f"2025-04-{d:02d}",
+            f"{h:02d}:00",
+            f"{h:02d}:45",
+            description=f"intervento {d}-{h}",
+            work_type="T" if h % 2 else "1",
+        )
+        for d in range(1, 29)
+        for h in range(8, 16)
+    ]
+    jobs.add_job(
+        "2025-04-01",
+        project,
+        "2025-04-01T08:10:00",
+        "2025-04-01T08:20:00",
+        description="intervento esistente",
+    )
+    overlap = _row(project, "2025-04-03", "09:30", "10:15")
+    result = jobs.add_jobs(
+        rows + [overlap], batch_size=50, allow_overlap=allow_overlap, deferred=True
+    )
+    expected = 225 if allow_overlap else 223
+    assert result[0] == expected
+    if not allow_overlap:
+        # il primo sovrapposto all'esistente, l'ultimo a una riga di un blocco prima
+        assert [n for n, _ in result[1]] == [1, len(rows) + 1]
+    by_triggers = _derived()
+    db.rebuild_rollup()
+    db.rebuild_intervals()
+    db.rebuild_search()
+    assert _derived() == by_triggers
+    # i trigger sono tornati
+    jobs.add_job("2025-05-01", project, "2025-05-01T08:00:00", "2025-05-01T09:00:00")
+    assert db.get_one("SELECT SUM(jobs) AS n FROM daily_totals")["n"] == expected + 2
@@ -0,0 +1,82 @@
+"""Job singoli: sovrapposizioni e tabelle derivate aggiornate dai trigger."""
+import pytest
+
+from controller import db_connector as db
+from controller import errors as er
+from model import jobs
+
+
+def _add(project, day, start, end, **extra):
+    return jobs.add_job(day, project, f"{day}T{start}:00", f"{day}T{end}:00", **extra)
+
+
+def _epochs(day, start, end):
+    start, end, _, _ = jobs._interval(f"{day}T{start}:00", f"{day}T{end}:00")
+    return jobs._epoch(start), jobs._epoch(end)
+
+
+@pytest.mark.parametrize(
+    "start, end, overlaps",
+    [
+        ("07:00", "08:00", False),  # finisce quando l'altro inizia
+        ("07:00", "08:01", True),
+        ("08:30", "08:45", True),  # contenuto
+        ("07:00", "11:00", True),  # contiene
+        ("09:59", "10:30", True),
+        ("10:00", "11:00", False),  # inizia quando l'altro finisce
+    ],
+)
+def test_find_overlap(project, start, end, overlaps):
+    job_id = _add(project, "2025-01-02", "08:00", "10:00")
+    found = jobs.find_overlap(*_epochs("2025-01-02", start, end))
+    assert found == (job_id if overlaps else None)
+
+
+def test_add_job_rejects_overlap_unless_allowed(project):
+    first = _add(project, "2025-01-02", "08:00", "10:00")
+    with pytest.raises(er.JobOverlap) as e:
+        _add(project, "2025-01-02", "09:00", "11:00")
+    assert e.value.other_id == first
+    second = _add(project, "2025-01-02", "09:00", "11:00", allow_overlap=True)
+    third = _add(project, "2025-01-02", "09:30", "09:45", allow_overlap=True)
+    _add(project, "2025-01-02", "11:00", "12:00")
+
+    pairs = [(a["id"], b["id"]) for a, b in jobs.all_overlaps()]
+    assert pairs == [(first, second), (first, third), (second, third)]
+
+
+def _totals():
+    cx = db.connect()
+    return cx.execute("SELECT * FROM daily_totals ORDER BY 1, 2, 3").fetchall()
+
+
+def _intervals():
+    cx = db.connect()
+    return cx.execute("SELECT * FROM jobs_intervals ORDER BY id").fetchall()
+
+
+def test_triggers_match_rebuild(project):
+    ids = [
+        _add(project, "2025-01-02", "08:00", "10:00", work_type="T"),
+        _add(project, "2025-01-02", "10:00", "12:30"),
+        _add(project, "2025-01-03", "23:00", "23:45", work_type="T"),
+        _add(project, "2025-01-04", "08:00", "09:00"),
+    ]
+    with db.transaction() as cx:
+        cx.execute(
+            "UPDATE jobs SET end_at = '2025-01-02T13:00:00', work_type_id = NULL "
+            "WHERE id = ?",
+            (ids[1],),
+        )
+        cx.execute(
+            "UPDATE jobs SET start_at = '2025-01-05T08:00:00', "
+            "end_at = '2025-01-05T08:30:00' WHERE id = ?",
+            (ids[2],),
+        )
+        cx.execute("DELETE FROM jobs WHERE id = ?", (ids[3],))
+    by_triggers = _totals(), _intervals()
+    assert by_triggers[0]
+
+    db.rebuild_rollup()
+    db.rebuild_intervals()
+    assert (_totals(), _intervals()) == by_triggers
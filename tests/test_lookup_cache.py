@@ -0,0 +1,39 @@
+"""Cache di lookup: i commit del processo invalidano solo le voci toccate."""
+import sqlite3
+
+import pytest
+
+from controller import errors as er
+from controller import lookup_cache
+from model import jobs
+
+
+def _add(project, day):
+    return jobs.add_job(day, project, f"{day}T08:00:00", f"{day}T09:00:00")
+
+
+def _external(database, sql):
+    other = sqlite3.connect(database)
+    other.execute(sql)
+    other.commit()
+    other.close()
+
+
+def test_add_job_hits_project_cache(project):
+    _add(project, "2025-01-01")
+    hits, misses = lookup_cache.PROJECTS.hits, lookup_cache.PROJECTS.misses
+    for day in range(2, 12):
+        _add(project, f"2025-01-{day:02d}")
+    assert lookup_cache.PROJECTS.hits - hits == 10
+    assert lookup_cache.PROJECTS.misses == misses
+
+
+@pytest.mark.parametrize(
+    "sql",
+    ["UPDATE projects SET name = 'Rinominato'", "DELETE FROM projects"],
+)
+def test_external_commit_invalidates_project(project, database, sql):
+    _add(project, "2025-01-01")
+    _external(database, sql)
+    with pytest.raises(er.ProjectNotFound):
+        _add(project, "2025-01-02")
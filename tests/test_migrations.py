@@ -0,0 +1,119 @@
+"""Migrazioni dello schema a partire dal database della prima versione."""
+import sqlite3
+
+import pytest
+
+from controller import db_connector as db
+from controller import lookup_cache, migrations
+from model import jobs, reports
+
+# schema della prima versione di chrono: jobs.work_type testo libero, niente
+# workdays, tabelle derivate, work_types né user_version
+BASELINE_SQL = """
+CREATE TABLE clients (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  name TEXT NOT NULL,
+  city TEXT NOT NULL UNIQUE,
+  nation TEXT,
+  notes TEXT,
+  created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE projects (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  client_id INTEGER NOT NULL,
+  name TEXT NOT NULL,
+  color TEXT,
+  active INTEGER NOT NULL DEFAULT 1,
+  created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+  UNIQUE(client_id, name),
+  FOREIGN KEY(client_id) REFERENCES clients(id) ON DELETE CASCADE
+);
+CREATE TABLE jobs (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  project_id INTEGER NOT NULL,
+  start_at TEXT NOT NULL,
+  end_at   TEXT NOT NULL,
+  place TEXT,
+  work_type TEXT,
+  description TEXT,
+  created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY(project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+CREATE INDEX idx_jobs_project ON jobs(project_id);
+
+INSERT INTO clients(name, city, nation) VALUES ('Cliente', 'Torino', 'Italia');
+INSERT INTO projects(client_id, name) VALUES (1, 'Progetto');
+INSERT INTO jobs(project_id, start_at, end_at, work_type, description) VALUES
+  (1, '2024-03-01T08:00:00', '2024-03-01T10:00:00', 'T', 'viaggio'),
+  (1, '2024-03-01T10:00:00', '2024-03-01T12:30:00', 'XYZ', 'collaudo quadro'),
+  (1, '2024-03-02T08:00:00', '2024-03-02T09:00:00', NULL, 'collaudo impianto'),
+  (1, '2024-03-04T08:00:00', '2024-03-04T09:00:00', '', NULL);
+"""
+
+
+@pytest.fixture
+def baseline(tmp_path, monkeypatch):
+    path = tmp_path / "baseline.sqlite"
+    cx = sqlite3.connect(path)
+    cx.executescript(BASELINE_SQL)
+    cx.close()
+    db.close_all()
+    monkeypatch.setattr(db, "DB_PATH", path)
+    lookup_cache.clear()
+    yield path
+    db.close_all()
+    lookup_cache.clear()
+
+
+def _columns(table):
+    return [r["name"] for r in db.connect().execute(f"PRAGMA table_info({table})")]
+
+
+def test_baseline_migrates_to_latest(baseline):
+    # blocchi da 2 job: le migrazioni a blocchi ne fanno più di uno
+    applied = migrations.migrate(batch_size=2)
+    assert applied == [m.version for m in migrations.MIGRATIONS]
+    assert migrations.current_version() == migrations.LATEST
+    assert "work_type" not in _columns("jobs")
+
+    rows = db.get_all(
+        """SELECT w.day, t.code FROM jobs j
+           JOIN workdays w ON w.id = j.workday_id
+           LEFT JOIN work_types t ON t.id = j.work_type_id
+           ORDER BY j.id"""
+    )
+    assert [(r["day"], r["code"]) for r in rows] == [
+        ("2024-03-01", "T"),
+        ("2024-03-01", "XYZ"),
+        ("2024-03-02", None),
+        ("2024-03-04", None),
+    ]
+
+    _, total = reports.report("2024-03-01", "2024-03-31", "day")
+    _, raw = reports.report("2024-03-01", "2024-03-31", "day", source="jobs")
+    assert total == raw == 6.5
+    assert sorted(r["id"] for r in jobs.search_jobs("collaudo")) == [2, 3]
+    assert sum(1 for _ in jobs.all_overlaps()) == 0
+
+    # di nuovo: nulla da fare
+    assert migrations.migrate() == []
+
+
+def test_interrupted_batched_migration_resumes(baseline):
+    migrations.migrate(target=1)
+    calls = []
+
+    def stop_after_first(m, last_id, max_id):
+        calls.append(last_id)
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        migrations.migrate(target=2, batch_size=1, progress=stop_after_first)
+    assert calls == [1]
+    assert migrations.current_version() == 1
+    assert "in corso (id 1/4)" in migrations.status()[1]["state"]
+
+    assert migrations.migrate(batch_size=1)[0] == 2
+    assert migrations.current_version() == migrations.LATEST
+    missing = db.get_one("SELECT COUNT(*) AS n FROM jobs WHERE workday_id IS NULL")
+    assert missing["n"] == 0
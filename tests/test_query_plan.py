@@ -0,0 +1,7 @@
+"""Le query del model devono usare un indice (vedi model/query_check.py)."""
+from model import query_check
+
+
+def test_no_scans():
+    scans = query_check.find_scans()
+    assert scans == [], "\n\n".join(f"{detail}\n  {sql}" for sql, detail in scans)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Dashboard Textual di chrono: clienti, progetti e job in tabelle a caricamento lazy.
+
+Le tabelle chiedono a SQLite una pagina alla volta (paginazione keyset) mentre
+si scorre; le query girano sui thread di async_db.AsyncDB, così l'interfaccia
+non si blocca e le connessioni restano calde.
+"""
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+from textual import work
+from textual.app import App, ComposeResult
+from textual.widgets import DataTable, Footer, Header, Static, TabbedContent, TabPane
+
+from controller import async_db
+from model import clients, jobs, projects, reports
+
+PAGE = 200
+# righe dal fondo a cui si richiede la pagina successiva
+PREFETCH = 50
+
+
+class LazyTable(DataTable):
+    """DataTable che carica le righe a pagine mentre ci si avvicina al fondo."""
+
+    def __init__(self, fetch, columns: list[str], **kwargs) -> None:
+        super().__init__(cursor_type="row", zebra_stripes=True, **kwargs)
+        self.fetch = fetch
+        self.fields = columns
+        self.after = None
+        self.exhausted = False
+
+    def on_mount(self) -> None:
+        self.add_columns(*self.fields)
+        self.load_more()
+
+    def reload(self) -> None:
+        self.clear()
+        self.after = None
+        self.exhausted = False
+        self.load_more()
+
+    def near_end(self) -> bool:
+        return not self.exhausted and (
+            self.cursor_row >= self.row_count - PREFETCH
+            or self.scroll_y >= self.max_scroll_y - PREFETCH
+        )
+
+    def watch_scroll_y(self, old_value: float, new_value: float) -> None:
+        super().watch_scroll_y(old_value, new_value)
+        if self.near_end():
+            self.load_more()
+
+    def on_data_table_row_highlighted(self, event: DataTable.RowHighlighted) -> None:
+        if self.near_end():
+            self.load_more()
+
+    @work(exclusive=True, exit_on_error=False)
+    async def load_more(self) -> None:
+        if self.exhausted:
+            return
+        rows = await self.app.run_db(self.fetch, limit=PAGE, after=self.after)
+        for row in rows:
+            cells = ("" if row[f] is None else str(row[f]) for f in self.fields)
+            self.add_row(*cells, key=str(row["id"]))
+        if rows:
+            self.after = rows[-1]["id"]
+        self.exhausted = len(rows) < PAGE
+
+
+class Totals(Static):
+    """Ore di oggi, della settimana e del mese, dai totali giornalieri."""
+
+    def on_mount(self) -> None:
+        self.refresh_totals()
+
+    @work(exclusive=True, exit_on_error=False)
+    async def refresh_totals(self) -> None:
+        today = date.today()
+        periods = {
+            "Oggi": (today, today),
+            "Settimana": (today - timedelta(days=today.weekday()), today),
+            "Mese": (today.replace(day=1), today),
+        }
+        parts = []
+        for label, (start, end) in periods.items():
+            _, total = await self.app.run_db(
+                reports.report, start.isoformat(), end.isoformat(), "year"
+            )
+            parts.append(f"{label}: [b]{total}[/b] h")
+        self.update("   ".join(parts))
+
+
+class ChronoApp(App):
+    """Dashboard di chrono."""
+
+    CSS_PATH = "tui.tcss"
+    TITLE = "chrono"
+    BINDINGS = [
+        ("r", "reload", "Ricarica"),
+        ("q", "quit", "Esci"),
+    ]
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.db = async_db.AsyncDB(readers=2)
+
+    async def run_db(self, fn, *args, **kwargs):
+        """Esegue una funzione di lettura del model sul pool del DB."""
+        return await self.db.run(fn, *args, **kwargs)
+
+    def compose(self) -> ComposeResult:
+        yield Header()
+        yield Totals(id="totals")
+        with TabbedContent():
+            with TabPane("Job", id="tab-jobs"):
+                yield LazyTable(
+                    jobs.list_jobs,
+                    [
+                        "start_at",
+                        "end_at",
+                        "hours",
+                        "client",
+                        "project",
+                        "work_type",
+                        "description",
+                    ],
+                )
+            with TabPane("Progetti", id="tab-projects"):
+                yield LazyTable(projects.list_project, ["name", "client", "active"])
+            with TabPane("Clienti", id="tab-clients"):
+                yield LazyTable(clients.list_clients, ["name", "city", "nation"])
+        yield Footer()
+
+    def action_reload(self) -> None:
+        for table in self.query(LazyTable):
+            table.reload()
+        self.query_one(Totals).refresh_totals()
+
+    async def on_unmount(self) -> None:
+        await self.db.close()
+
+
+if __name__ == "__main__":
+    ChronoApp().run()